@@ -4,21 +4,22 @@
 # @Site    : x-item.com
 # @Software: PyCharm
 # @Create  : 2021/2/27 19:36
-# @Update  : 2024/5/5 7:07
+# @Update  : 2026/10/18 9:15
 # @Detail  : 块 基类
 
 import os
 import subprocess
+from collections.abc import MutableSequence
 from dataclasses import dataclass
-from io import BytesIO
+from io import BytesIO, IOBase
 from pathlib import Path
-from typing import Union
+from typing import Callable, Union
 
-from league_tools.tools import BinaryReader
+from league_tools.tools import BinaryReader, get_record
 
 
 class SectionNoId:
-    def __init__(self, data: Union[BinaryReader, BytesIO, bytes, str, os.PathLike]):
+    def __init__(self, data: Union[BinaryReader, BytesIO, IOBase, bytes, str, os.PathLike]):
         self._data = data
         if not isinstance(data, BinaryReader):
             self._data = BinaryReader(data)
@@ -46,7 +47,7 @@ class Section(SectionNoId):
         '_data'
     ]
 
-    def __init__(self, data: Union[BinaryReader, BytesIO, bytes, str, os.PathLike]):
+    def __init__(self, data: Union[BinaryReader, BytesIO, IOBase, bytes, str, os.PathLike]):
         super().__init__(data)
 
     def _read_object(self):
@@ -60,7 +61,7 @@ class Section(SectionNoId):
 
 
 class SectionNoIdBNK(SectionNoId):
-    def __init__(self, data: Union[BinaryReader, BytesIO, bytes, str, os.PathLike], version: int = 0):
+    def __init__(self, data: Union[BinaryReader, BytesIO, IOBase, bytes, str, os.PathLike], version: int = 0):
         self.bnk_version = version
         super().__init__(data)
 
@@ -74,6 +75,53 @@ class SectionBNK(SectionNoIdBNK, Section):
         super().__init__(*args, **kwargs)
 
 
+class RecordList(MutableSequence):
+    """
+    由 read_records 读取的列式记录表生成的惰性列表
+    元素在首次访问时才通过 factory 构造并缓存, 之后与普通列表行为一致(可修改、删除)
+    """
+
+    def __init__(self, records, factory: Callable):
+        """
+        :param records: read_records 返回的记录表
+        :param factory: 由单条记录构造对象, 参数为记录的各个字段
+        """
+        self.records = records
+        self._factory = factory
+        # 未构造的元素以记录索引(int)占位
+        self._items = list(range(len(records)))
+
+    def _make(self, index):
+        item = self._items[index]
+        if type(item) is int:
+            item = self._items[index] = self._factory(*get_record(self.records, item))
+        return item
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._make(i) for i in range(*index.indices(len(self._items)))]
+        return self._make(index)
+
+    def __setitem__(self, index, value):
+        self._items[index] = value
+
+    def __delitem__(self, index):
+        del self._items[index]
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        for i in range(len(self._items)):
+            yield self._make(i)
+
+    def insert(self, index, value):
+        self._items.insert(index, value)
+
+    def __repr__(self):
+        return f'RecordList({len(self._items)})'
+
+
 @dataclass
 class WemFile:
     id: int
@@ -4,14 +4,27 @@
 # @Site    : x-item.com
 # @Software: PyCharm
 # @Create  : 2021/2/28 13:14
-# @Update  : 2024/5/4 16:50
-# @Detail  : 英雄联盟皮肤Bin文件解析(仅提取语音触发事件名称)
+# @Update  : 2026/10/18 9:55
+# @Detail  : 英雄联盟Bin文件解析, 属性树流式解析以及皮肤语音触发事件名称提取
 
 import json
-from dataclasses import dataclass
-from typing import List, Union
+import re
+import struct
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from enum import IntEnum
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from loguru import logger
 
 from league_tools.base import SectionNoId
+from league_tools.tools import BinaryReader
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 CHINESE_EVENTS = {
     'oncast': '释放时',
@@ -20,16 +33,479 @@ CHINESE_EVENTS = {
 }
 
 
-def str_fnv_32(name: str):
+@lru_cache(maxsize=1 << 16)
+def str_fnv_32(name: str) -> int:
+    """
+    Wwise 事件名称使用的哈希(FNV-1, 小写), 结果带缓存, 同名事件在大量 BIN 中重复出现
+    :param name:
+    :return:
+    """
     h = 0x811c9dc5
+    for c in map(ord, name.lower()):
+        h = ((h * 0x01000193) & 0xFFFFFFFF) ^ c
+    return h
+
+
+# 批量哈希时每次处理的名称数量, 限制中间数组的内存占用
+_FNV_BATCH = 1 << 16
+# 少于该数量时逐个计算, 可以命中缓存且没有 numpy 的固定开销
+_FNV_VECTOR_MIN = 64
+
+
+def str_fnv_32_batch(names: Iterable[str]) -> List[int]:
+    """
+    批量计算 str_fnv_32, 安装 numpy 且数量较多时向量化完成
+    名称拼接后按码位存储(全部为 ASCII 时每字符 1 字节, 否则为 UTF-32), 按长度排序后逐个字符位置
+    对仍未结束的名称同时进行 uint32 乘法与异或; 含非 ASCII 字符的名称单独计算
+    :param names: 名称, 可以是 numpy 字符串数组
+    :return: 与输入顺序一致的哈希列表
+    """
+    if numpy is not None and isinstance(names, numpy.ndarray):
+        names = names.tolist()
+    elif not isinstance(names, (list, tuple)):
+        names = list(names)
+    if numpy is None or len(names) < _FNV_VECTOR_MIN:
+        return [str_fnv_32(name) for name in names]
 
-    for c in name:
-        h = (h * 0x01000193) % 0x100000000
-        h = (h ^ ord(c.lower())) % 0x100000000
+    prime = numpy.uint32(0x01000193)
+    result = []
+    for start in range(0, len(names), _FNV_BATCH):
+        chunk = names[start:start + _FNV_BATCH]
+        joined = ''.join(chunk)
+        try:
+            # 通常全部为 ASCII, 每个字符只占 1 字节
+            codes = numpy.frombuffer(joined.encode('ascii'), dtype=numpy.uint8).copy()
+            others = []
+        except UnicodeEncodeError:
+            codes = numpy.frombuffer(joined.encode('utf-32-le'), dtype=numpy.uint32).copy()
+            others = [i for i, name in enumerate(chunk) if not name.isascii()]
+        # 在码位上转换 ASCII 大写字母, 含其他字符的名称之后交给 str_fnv_32
+        codes += ((codes >= 0x41) & (codes <= 0x5A)).astype(codes.dtype) << 5
 
+        lengths = numpy.fromiter(map(len, chunk), dtype=numpy.int64, count=len(chunk))
+        starts = numpy.cumsum(lengths) - lengths
+        # 按长度降序排列, 第 i 列只处理长度大于 i 的前若干个名称, 不需要填充与掩码
+        order = numpy.argsort(-lengths, kind='stable')
+        starts = starts[order]
+        # 长度大于 i 的名称数量
+        remaining = (len(chunk) - numpy.cumsum(numpy.bincount(lengths)))[:-1].tolist()
+        h = numpy.full(len(chunk), 0x811c9dc5, dtype=numpy.uint32)
+        for i, count in enumerate(remaining):
+            h[:count] = (h[:count] * prime) ^ codes[starts[:count] + i]
+
+        hashes = numpy.empty_like(h)
+        hashes[order] = h
+        for i in others:
+            hashes[i] = str_fnv_32(chunk[i])
+        result.extend(hashes.tolist())
+    return result
+
+
+def str_fnv1a_32(name: str) -> int:
+    """
+    BIN 中类名、字段名使用的哈希(FNV-1a, 小写)
+    :param name:
+    :return:
+    """
+    h = 0x811c9dc5
+    for c in name.lower().encode('utf-8'):
+        h = ((h ^ c) * 0x01000193) & 0xFFFFFFFF
     return h
 
 
+class BinType(IntEnum):
+    """
+    BIN 属性值类型
+    """
+    NONE = 0
+    BOOL = 1
+    I8 = 2
+    U8 = 3
+    I16 = 4
+    U16 = 5
+    I32 = 6
+    U32 = 7
+    I64 = 8
+    U64 = 9
+    F32 = 10
+    VEC2 = 11
+    VEC3 = 12
+    VEC4 = 13
+    MTX44 = 14
+    RGBA = 15
+    STRING = 16
+    HASH = 17
+    FILE = 18
+    LIST = 0x80
+    LIST2 = 0x81
+    POINTER = 0x82
+    EMBED = 0x83
+    LINK = 0x84
+    OPTION = 0x85
+    MAP = 0x86
+    FLAG = 0x87
+
+
+# 定长类型的结构
+_FIXED = {
+    BinType.NONE: struct.Struct('<'),
+    BinType.BOOL: struct.Struct('<?'),
+    BinType.I8: struct.Struct('<b'),
+    BinType.U8: struct.Struct('<B'),
+    BinType.I16: struct.Struct('<h'),
+    BinType.U16: struct.Struct('<H'),
+    BinType.I32: struct.Struct('<i'),
+    BinType.U32: struct.Struct('<I'),
+    BinType.I64: struct.Struct('<q'),
+    BinType.U64: struct.Struct('<Q'),
+    BinType.F32: struct.Struct('<f'),
+    BinType.VEC2: struct.Struct('<2f'),
+    BinType.VEC3: struct.Struct('<3f'),
+    BinType.VEC4: struct.Struct('<4f'),
+    BinType.MTX44: struct.Struct('<16f'),
+    BinType.RGBA: struct.Struct('<4B'),
+    BinType.HASH: struct.Struct('<I'),
+    BinType.FILE: struct.Struct('<Q'),
+    BinType.LINK: struct.Struct('<I'),
+    BinType.FLAG: struct.Struct('<?'),
+}
+_CONTAINERS = (BinType.LIST, BinType.LIST2, BinType.POINTER, BinType.EMBED, BinType.OPTION, BinType.MAP)
+_U8 = struct.Struct('<B')
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<I')
+# 字段: 名称哈希, 类型
+_FIELD = struct.Struct('<IB')
+# 列表: 元素类型, 字节数, 数量
+_LIST = struct.Struct('<BII')
+# 结构体: 字节数, 字段数量
+_STRUCT = struct.Struct('<IH')
+# 可选值: 元素类型, 数量
+_OPTION = struct.Struct('<BB')
+# 字典: 键类型, 值类型, 字节数, 数量
+_MAP = struct.Struct('<BBII')
+# 条目: 字节数, 路径哈希, 字段数量
+_ENTRY = struct.Struct('<IIH')
+
+
+@dataclass
+class BinStruct:
+    """
+    pointer、embed 类型的值
+
+    :param class_hash: 类名哈希。
+    :param fields: {字段名哈希: 值}。
+    """
+    class_hash: int
+    fields: Dict[int, Any] = field(default_factory=dict)
+
+    def get(self, name: Union[str, int], default=None):
+        return self.fields.get(_to_name_hash(name), default)
+
+
+@dataclass
+class BinEntry(BinStruct):
+    """
+    BIN 顶层条目
+
+    :param path_hash: 条目路径哈希。
+    """
+    path_hash: int = 0
+
+
+def _to_name_hash(name: Union[str, int]) -> int:
+    return str_fnv1a_32(name) if isinstance(name, str) else name
+
+
+class BinParser:
+    """
+    PROP/PTCH 格式 BIN 文件的流式解析
+
+    按顺序线性读取条目表与属性树, 不回溯; 不需要的条目、字段、子树根据其长度字段直接跳过, 不解码.
+    类名、字段名可以传入字符串(自动计算哈希)或哈希值.
+
+    只读取 SkinCharacterDataProperties 的 skinAudioProperties 字段:
+        parser.entries(classes=['SkinCharacterDataProperties'], fields=['skinAudioProperties'])
+    """
+
+    def __init__(self, data: Union[BinaryReader, bytes, str]):
+        """
+        :param data: 文件路径、字节数据或 BinaryReader
+        """
+        reader = data if isinstance(data, BinaryReader) else BinaryReader(data)
+        # 保持引用, 映射在读取器回收时释放
+        self._reader = reader
+        self.view = reader.buffer.view if reader.zero_copy else memoryview(reader.pread(0, reader.end))
+        self.links: List[str] = []
+        self.entry_classes: List[int] = []
+        self._read_header()
+
+    def _read_header(self):
+        view = self.view
+        magic = bytes(view[:4])
+        pos = 4
+        self.is_patch = magic == b'PTCH'
+        if self.is_patch:
+            # 两个未知的 uint32
+            pos += 8
+            magic = bytes(view[pos:pos + 4])
+            pos += 4
+        if magic != b'PROP':
+            raise ValueError(f'错误的文件头: {magic}')
+        self.version, = _U32.unpack_from(view, pos)
+        pos += 4
+        if self.version >= 2:
+            count, = _U32.unpack_from(view, pos)
+            pos += 4
+            for _ in range(count):
+                value, pos = self._read_string(pos)
+                self.links.append(value)
+        count, = _U32.unpack_from(view, pos)
+        pos += 4
+        self.entry_classes = list(struct.unpack_from(f'<{count}I', view, pos))
+        self._entries_pos = pos + 4 * count
+
+    def _read_string(self, pos: int) -> Tuple[str, int]:
+        length, = _U16.unpack_from(self.view, pos)
+        pos += 2
+        return bytes(self.view[pos:pos + length]).decode('utf-8'), pos + length
+
+    @staticmethod
+    def _type(value: int) -> BinType:
+        try:
+            return BinType(value)
+        except ValueError:
+            raise ValueError(f'未知的属性类型: {value}')
+
+    def _skip(self, t: BinType, pos: int) -> int:
+        """
+        跳过一个值, 容器类型根据长度字段跳过
+        :return: 值之后的位置
+        """
+        if (s := _FIXED.get(t)) is not None:
+            return pos + s.size
+        view = self.view
+        if t == BinType.STRING:
+            return pos + 2 + _U16.unpack_from(view, pos)[0]
+        if t in (BinType.LIST, BinType.LIST2):
+            return pos + 5 + _U32.unpack_from(view, pos + 1)[0]
+        if t in (BinType.POINTER, BinType.EMBED):
+            class_hash, = _U32.unpack_from(view, pos)
+            if class_hash == 0 and t == BinType.POINTER:
+                return pos + 4
+            return pos + 8 + _U32.unpack_from(view, pos + 4)[0]
+        if t == BinType.OPTION:
+            inner, count = _OPTION.unpack_from(view, pos)
+            pos += 2
+            return self._skip(self._type(inner), pos) if count else pos
+        if t == BinType.MAP:
+            return pos + 6 + _U32.unpack_from(view, pos + 2)[0]
+        raise ValueError(f'未知的属性类型: {t}')
+
+    def _read(self, t: BinType, pos: int) -> Tuple[Any, int]:
+        """
+        读取一个值
+        :return: (值, 值之后的位置)
+        """
+        view = self.view
+        if (s := _FIXED.get(t)) is not None:
+            value = s.unpack_from(view, pos)
+            return (value[0] if len(value) == 1 else value if value else None), pos + s.size
+        if t == BinType.STRING:
+            return self._read_string(pos)
+        if t in (BinType.LIST, BinType.LIST2):
+            inner, _, count = _LIST.unpack_from(view, pos)
+            pos += _LIST.size
+            inner = self._type(inner)
+            values = []
+            for _ in range(count):
+                value, pos = self._read(inner, pos)
+                values.append(value)
+            return values, pos
+        if t in (BinType.POINTER, BinType.EMBED):
+            class_hash, = _U32.unpack_from(view, pos)
+            pos += 4
+            if class_hash == 0 and t == BinType.POINTER:
+                return None, pos
+            _, count = _STRUCT.unpack_from(view, pos)
+            fields, pos = self._read_fields(pos + _STRUCT.size, count)
+            return BinStruct(class_hash, fields), pos
+        if t == BinType.OPTION:
+            inner, count = _OPTION.unpack_from(view, pos)
+            pos += _OPTION.size
+            if not count:
+                return None, pos
+            return self._read(self._type(inner), pos)
+        if t == BinType.MAP:
+            key_type, value_type, _, count = _MAP.unpack_from(view, pos)
+            pos += _MAP.size
+            key_type, value_type = self._type(key_type), self._type(value_type)
+            values = {}
+            for _ in range(count):
+                key, pos = self._read(key_type, pos)
+                values[key], pos = self._read(value_type, pos)
+            return values, pos
+        raise ValueError(f'未知的属性类型: {t}')
+
+    def _read_fields(self, pos: int, count: int, names: Optional[set] = None) -> Tuple[Dict[int, Any], int]:
+        fields = {}
+        for _ in range(count):
+            name, t = _FIELD.unpack_from(self.view, pos)
+            pos += _FIELD.size
+            t = self._type(t)
+            if names is None or name in names:
+                fields[name], pos = self._read(t, pos)
+            else:
+                pos = self._skip(t, pos)
+        return fields, pos
+
+    def _iter_entries(self, classes: Optional[Iterable[Union[str, int]]]) -> Iterator[Tuple[int, int, int, int, int]]:
+        """
+        遍历条目表, 跳过类名不匹配的条目
+        :return: (类名哈希, 路径哈希, 字段数量, 第一个字段的位置, 条目结尾)
+        """
+        wanted = None if classes is None else {_to_name_hash(c) for c in classes}
+        pos = self._entries_pos
+        for class_hash in self.entry_classes:
+            length, path_hash, count = _ENTRY.unpack_from(self.view, pos)
+            end = pos + 4 + length
+            if wanted is None or class_hash in wanted:
+                yield class_hash, path_hash, count, pos + _ENTRY.size, end
+            pos = end
+        self._patches_pos = pos
+
+    def entries(self, classes: Optional[Iterable[Union[str, int]]] = None,
+                fields: Optional[Iterable[Union[str, int]]] = None) -> Iterator[BinEntry]:
+        """
+        读取条目
+        :param classes: 只读取这些类的条目, 为空时读取全部
+        :param fields: 只解码这些顶层字段, 其余字段直接跳过, 为空时解码全部
+        :return:
+        """
+        names = None if fields is None else {_to_name_hash(f) for f in fields}
+        for class_hash, path_hash, count, pos, _ in self._iter_entries(classes):
+            values, _ = self._read_fields(pos, count, names)
+            yield BinEntry(class_hash, values, path_hash)
+
+    def patches(self) -> Iterator[Tuple[int, str, Any]]:
+        """
+        读取 PTCH 文件中的补丁项
+        :return: (条目路径哈希, 字段路径, 值)
+        """
+        if not self.is_patch or self.version < 3:
+            return
+        if not hasattr(self, '_patches_pos'):
+            for _ in self._iter_entries(()):
+                pass
+        pos = self._patches_pos
+        count, = _U32.unpack_from(self.view, pos)
+        pos += 4
+        for _ in range(count):
+            path_hash, _, t = struct.unpack_from('<IIB', self.view, pos)
+            path, pos = self._read_string(pos + 9)
+            value, pos = self._read(self._type(t), pos)
+            yield path_hash, path, value
+
+    def walk(self, visitor: Callable[[Tuple, Optional[BinType], Any], Optional[bool]],
+             classes: Optional[Iterable[Union[str, int]]] = None,
+             containing: Optional[Iterable[Union[str, int]]] = None):
+        """
+        以访问者方式遍历属性树
+
+        visitor(路径, 类型, 值) 对每个条目与值调用一次, 路径为 (条目路径哈希, 字段名哈希或列表下标或字典键, ...):
+            条目: 类型为 None, 值为类名哈希;
+            pointer、embed: 值为类名哈希(空指针为 0);
+            list、list2、option: 值为元素类型; map: 值为 (键类型, 值类型);
+            容器之后依次访问其中的元素;
+            其他类型: 值为解码后的值.
+        对条目或容器返回 False 时跳过其全部内容, 不解码.
+
+        containing 按原始数据预先筛选: 先找出这些字段名哈希在文件中的全部位置,
+        数据范围内不含任何一个位置的条目、结构体以及元素为容器的列表、字典直接按长度跳过, 不调用 visitor.
+
+        :param visitor: 访问函数
+        :param classes: 只遍历这些类的条目, 为空时遍历全部
+        :param containing: 只进入可能包含这些字段的子树, 为空时不筛选
+        :return:
+        """
+        hits = None
+        if containing is not None:
+            pattern = b'|'.join(re.escape(struct.pack('<I', _to_name_hash(f))) for f in containing)
+            hits = [m.start() for m in re.finditer(pattern, self.view)] if pattern else []
+        for class_hash, path_hash, count, pos, end in self._iter_entries(classes):
+            if hits is not None and not self._contains(hits, pos, end):
+                continue
+            path = (path_hash,)
+            if visitor(path, None, class_hash) is False:
+                continue
+            self._walk_fields(pos, count, path, visitor, hits)
+
+    def _nested(self, t: BinType, pos: int) -> bool:
+        """
+        容器中是否可能出现字段, 即结构体或元素为容器的列表、字典
+        """
+        if t in (BinType.POINTER, BinType.EMBED):
+            return True
+        if t in (BinType.LIST, BinType.LIST2, BinType.OPTION):
+            return self.view[pos] in _CONTAINERS
+        return self.view[pos + 1] in _CONTAINERS
+
+    @staticmethod
+    def _contains(hits: List[int], start: int, end: int) -> bool:
+        i = bisect_left(hits, start)
+        return i < len(hits) and hits[i] < end
+
+    def _walk_fields(self, pos: int, count: int, path: Tuple, visitor, hits: Optional[List[int]] = None) -> int:
+        for _ in range(count):
+            name, t = _FIELD.unpack_from(self.view, pos)
+            pos = self._walk(self._type(t), pos + _FIELD.size, path + (name,), visitor, hits)
+        return pos
+
+    def _walk(self, t: BinType, pos: int, path: Tuple, visitor, hits: Optional[List[int]] = None) -> int:
+        if t not in _CONTAINERS:
+            value, pos = self._read(t, pos)
+            visitor(path, t, value)
+            return pos
+
+        view = self.view
+        if hits is not None and self._nested(t, pos):
+            end = self._skip(t, pos)
+            if not self._contains(hits, pos, end):
+                return end
+
+        if t in (BinType.POINTER, BinType.EMBED):
+            class_hash, = _U32.unpack_from(view, pos)
+            if visitor(path, t, class_hash) is False or (class_hash == 0 and t == BinType.POINTER):
+                return self._skip(t, pos)
+            _, count = _STRUCT.unpack_from(view, pos + 4)
+            return self._walk_fields(pos + 4 + _STRUCT.size, count, path, visitor, hits)
+
+        if t in (BinType.LIST, BinType.LIST2):
+            inner, _, count = _LIST.unpack_from(view, pos)
+            inner = self._type(inner)
+            if visitor(path, t, inner) is False:
+                return self._skip(t, pos)
+            pos += _LIST.size
+            for i in range(count):
+                pos = self._walk(inner, pos, path + (i,), visitor, hits)
+            return pos
+        if t == BinType.OPTION:
+            inner, count = _OPTION.unpack_from(view, pos)
+            inner = self._type(inner)
+            if visitor(path, t, inner) is False:
+                return self._skip(t, pos)
+            pos += _OPTION.size
+            return self._walk(inner, pos, path + (0,), visitor, hits) if count else pos
+        key_type, value_type, _, count = _MAP.unpack_from(view, pos)
+        key_type, value_type = self._type(key_type), self._type(value_type)
+        if visitor(path, t, (key_type, value_type)) is False:
+            return self._skip(t, pos)
+        pos += _MAP.size
+        for _ in range(count):
+            key, pos = self._read(key_type, pos)
+            pos = self._walk(value_type, pos, path + (key,), visitor, hits)
+        return pos
+
+
 @dataclass
 class StringHash:
     string: str
@@ -85,49 +561,134 @@ class BIN(SectionNoId):
                         string=item,
                         hash=str_fnv_32(item)
                     ))
+            else:
+                break
 
     def _read(self):
-        if self._data.customize('<4s') != self.head:
+        """
+        遍历属性树, 在全部条目中查找包含 bankPath 字段的结构体(BankUnit),
+        数据中不含 bankPath 字段名哈希的子树以及元素不是容器的列表、字典直接按长度跳过;
+        属性树无法解析时退化为按特征搜索
+        :return:
+        """
+        if self._data.customize('<4s') not in (self.head, b'PTCH'):
+            raise ValueError('文件类型错误.')
+        try:
+            self._read_properties(BinParser(self._data))
+        except (ValueError, struct.error) as e:
+            logger.debug(f'属性解析失败, 按特征搜索: {e}')
+            self._data.seek(0, 0)
+            self._read_scan()
+
+    def _read_properties(self, parser: 'BinParser'):
+        bank_path, events_hash = str_fnv1a_32('bankPath'), str_fnv1a_32('events')
+        # 结构体路径 -> {字段名哈希: 字符串列表}
+        units: Dict[Tuple, Dict[int, List[str]]] = {}
+
+        def visit(path: Tuple, t: Optional[BinType], value: Any) -> Optional[bool]:
+            if t in (BinType.LIST, BinType.LIST2, BinType.OPTION):
+                if path[-1] in (bank_path, events_hash) and value == BinType.STRING:
+                    units.setdefault(path[:-1], {})[path[-1]] = []
+                    return None
+                # 元素不可能包含结构体
+                return value in _CONTAINERS
+            if t == BinType.MAP:
+                return value[1] in _CONTAINERS
+            if t == BinType.STRING and len(path) > 2 and path[-2] in (bank_path, events_hash):
+                unit = units.get(path[:-2])
+                if unit is not None and path[-2] in unit:
+                    unit[path[-2]].append(value)
+            return None
+
+        parser.walk(visit, containing=[bank_path])
+
+        hash_tables, res = [], set()
+        for unit in units.values():
+            if bank_path not in unit:
+                continue
+            paths = unit[bank_path]
+            events = unit.get(events_hash)
+            if events:
+                hash_tables.extend(StringHash(string=item, hash=h)
+                                   for item, h in zip(events, str_fnv_32_batch(events)))
+                if paths:
+                    res.add(tuple(paths))
+        self.hash_tables = hash_tables
+        self.audio_files = res
+
+    def _read_scan(self):
+        if self._data.customize('<4s') not in (self.head, b'PTCH'):
             raise ValueError('文件类型错误.')
         self.hash_tables = []
-        head = 'ASSETS/Sounds/Wwise2016'
         res = set()
-        temp = []
-        self._data.seek(4, 0)
-        while not self._data.is_end():
-            if self._data.find(head) != -1:
-                group = []
-                #         uint32: 文件数量
-                #         FOR EACH (文件数量) {
-                #             uint16: 字符串长度
-                #             byte[]: 文件路径字符串
-                #         } END FOR
-                self._data.seek(-6 - len(head), 1)
-                item_length = self._data.customize('<L')
-                for i in range(item_length):
-                    length = self._data.customize('<H')
-                    item = self._data.str(length)
-                    if item not in temp:
-                        group.append(item)
-                    else:
-                        temp.append(temp)
-
-                if self._data.bytes(4) == self.signature:
-                    self._data.seek(6)
-                    count = self._data.customize('<L')
-                    for i in range(count):
-                        length = self._data.customize('<H')
-                        item = self._data.str(length)
-                        self.hash_tables.append(StringHash(
-                            string=item,
-                            hash=str_fnv_32(item)
-                        ))
-                    if group:
-                        res.add(tuple(group))
-            else:
-                break
+        for group, events in self.scan(self._data):
+            if events:
+                self.hash_tables.extend(events)
+                if group:
+                    res.add(group)
         self.audio_files = res
 
+    @classmethod
+    def _read_strings(cls, view: memoryview, pos: int) -> Tuple[List[str], int]:
+        """
+        读取字符串列表
+        #         uint32: 文件数量
+        #         FOR EACH (文件数量) {
+        #             uint16: 字符串长度
+        #             byte[]: 文件路径字符串
+        #         } END FOR
+        :return: (字符串列表, 列表之后的位置)
+        """
+        count, = _U32.unpack_from(view, pos)
+        pos += 4
+        items = []
+        for _ in range(count):
+            length, = _U16.unpack_from(view, pos)
+            pos += 2
+            if pos + length > len(view):
+                raise ValueError('字符串超出文件范围')
+            items.append(bytes(view[pos:pos + length]).decode('utf-8'))
+            pos += length
+        return items, pos
+
+    @classmethod
+    def scan(cls, data: Union[BinaryReader, bytes, str], head: str = 'ASSETS/Sounds/Wwise2016'
+             ) -> Iterator[Tuple[Tuple[str, ...], List[StringHash]]]:
+        """
+        按特征一次扫描整个文件, 惰性返回音频文件组及其触发事件, 不解析属性树
+
+        以 head 开头的字符串所在的列表为一组音频文件, 紧随其后的 events 字段(signature)为该组的事件列表;
+        文件只映射一次, 所有特征在同一次 re.finditer 中按位置顺序处理, 不重复读取.
+
+        :param data: 文件路径、字节数据或 BinaryReader
+        :param head: 音频文件路径特征
+        :return: (音频文件路径组, 事件列表) 迭代器, 没有事件时事件列表为空
+        """
+        reader = data if isinstance(data, BinaryReader) else BinaryReader(data)
+        view = reader.buffer.view if reader.zero_copy else memoryview(reader.pread(0, reader.end))
+        prefix = head.encode('utf-8')
+        # 字符串列表中, 路径前依次为 uint32 数量与 uint16 长度
+        back = 6
+        pos = 0
+        for m in re.finditer(re.escape(prefix), view):
+            if m.start() < pos or m.start() < back:
+                # 位于已读取的列表中
+                continue
+            try:
+                group, end = cls._read_strings(view, m.start() - back)
+            except (ValueError, struct.error, UnicodeDecodeError):
+                continue
+            pos = end
+            events = []
+            if bytes(view[end:end + 4]) == cls.signature:
+                try:
+                    # 字段哈希之后为 uint8 列表类型, uint8 元素类型, uint32 字节数
+                    items, pos = cls._read_strings(view, end + 10)
+                except (ValueError, struct.error, UnicodeDecodeError):
+                    items = []
+                events = [StringHash(string=item, hash=h) for item, h in zip(items, str_fnv_32_batch(items))]
+            yield tuple(group), events
+
     def get_hash_table(self) -> List:
         """
         输出格式为列表
@@ -158,31 +719,7 @@ class BIN(SectionNoId):
         :param head: 路径特征
         :return:
         """
-        res = set()
-        temp = []
-        self._data.seek(4, 0)
-        while not self._data.is_end():
-            if self._data.find(head) != -1:
-                group = []
-                #         uint32: 文件数量
-                #         FOR EACH (文件数量) {
-                #             uint16: 字符串长度
-                #             byte[]: 文件路径字符串
-                #         } END FOR
-                self._data.seek(-6 - len(head), 1)
-                item_length = self._data.customize('<L')
-                for i in range(item_length):
-                    length = self._data.customize('<H')
-                    item = self._data.str(length)
-                    if item not in temp:
-                        group.append(item)
-                    else:
-                        temp.append(temp)
-                if group:
-                    res.add(tuple(group))
-            else:
-                break
-        return list(res)
+        return list({group for group, _ in self.scan(self._data, head) if group})
 
     def __repr__(self):
         return f'Hash_Table_Amount: {len(self.hash_tables)}'
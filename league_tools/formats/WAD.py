@@ -4,26 +4,243 @@
 # @Site    : x-item.com
 # @Software: PyCharm
 # @Create  : 2021/3/2 22:36
-# @Update  : 2024/9/2 12:25
+# @Update  : 2026/10/18 9:58
 # @Detail  : 文件结构来源于以下两个库
 
 # https://github.com/Pupix/lol-wad-parser/tree/master/lib
 # https://github.com/CommunityDragon/CDTB/blob/master/cdragontoolbox/wad.py
 
 import gzip
-from dataclasses import dataclass
+import hashlib
+import io
+import json
+import mmap
+import os
+import shutil
+import struct
+import threading
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import count, islice
 from pathlib import Path
-from typing import AnyStr, Callable, Dict, List, Optional, Union
+from typing import AnyStr, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import xxhash
 import zstd
 from loguru import logger
 
-from league_tools.base import SectionNoId
-from league_tools.tools import BinaryReader
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from league_tools.base import RecordList, SectionNoId
+from league_tools.tools import BinaryReader, ByteLRUCache, HashTable, MemoryBuffer, get_record
+from league_tools.tools.Binary.reader import get_struct
 from league_tools.utils.type_hints import StrPath
 
 
+# TOC 记录结构, v1 为 24 字节, v2/v3 为 32 字节
+_TOC_V1 = [
+    ('path_hash', 'Q'), ('offset', 'I'), ('compressed_size', 'I'), ('size', 'I'), ('type', 'I')
+]
+_TOC_V2 = [
+    ('path_hash', 'Q'), ('offset', 'I'), ('compressed_size', 'I'), ('size', 'I'), ('type', 'B'),
+    ('duplicate', '?'), ('first_subchunk_index', 'H'), ('sha256', 'Q')
+]
+# 计算文件头大小所需的最大长度, 见 WadHeaderAnalyzer
+_HEADER_MAX_SIZE = 4 + 268
+# subchunktoc 记录结构
+_SUBCHUNK_TOC = [('compressed_size', 'I'), ('size', 'I'), ('checksum', 'Q')]
+
+_ZSTD_MAGIC = 0xFD2FB528
+# 补丁文件头: 标识、版本、基础 WAD 的 TOC 摘要
+_PATCH_HEADER = struct.Struct('<4sLQ')
+_PATCH_MAGIC = b'LTWP'
+_PATCH_VERSION = 1
+# 进程池解压时每次提交的最大条目数量
+_PROCESS_BATCH = 32
+# ioctl FICLONE, 创建 reflink(写时复制)
+_FICLONE = 0x40049409
+# 无路径 WAD 实例的标识序号, 不会像 id() 那样在对象释放后被重复使用
+_instance_ids = count()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _subchunk_executor() -> ThreadPoolExecutor:
+    """
+    子块并行解压使用的共享线程池, 首次使用时创建
+    子块任务本身不等待其他任务, 在提取线程中使用也不会死锁
+    :return:
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(thread_name_prefix='wad-subchunk')
+    return _executor
+
+
+# match_hashes 子进程中的目标哈希
+_match_targets: frozenset = frozenset()
+
+
+def _init_match(targets: frozenset):
+    global _match_targets
+    _match_targets = targets
+
+
+def _match_chunk(chunk: List[str], targets: Optional[frozenset] = None) -> List[Tuple[int, str]]:
+    """
+    计算一块候选路径的哈希, 返回命中的部分
+    :param chunk:
+    :param targets: 目标哈希, 为空时使用子进程初始化时传入的集合
+    :return:
+    """
+    digest = xxhash.xxh64_intdigest
+    if targets is None:
+        targets = _match_targets
+    hits = []
+    for path in chunk:
+        path_hash = digest(path.lower().encode('utf-8'))
+        if path_hash in targets:
+            hits.append((path_hash, path))
+    return hits
+
+
+def _subchunk_toc_name(file: Path) -> Optional[str]:
+    """
+    根据 WAD 文件路径推断其 subchunktoc 在 WAD 中的路径
+    如 DATA/FINAL/Champions/Aatrox.wad.client 对应 data/final/champions/aatrox.wad.subchunktoc
+    :param file: WAD 文件路径
+    :return: 路径不在 DATA 目录下时返回 None
+    """
+    parts = Path(file).parts
+    lower = [part.lower() for part in parts]
+    if 'data' not in lower:
+        return None
+    # 取最后一个 DATA 目录开始的相对路径
+    start = len(lower) - 1 - lower[::-1].index('data')
+    name = '/'.join(parts[start:])
+    if name.lower().endswith('.client'):
+        name = name[:-len('.client')]
+    return f'{name}.subchunktoc'
+
+
+# 文件头标识 -> 扩展名, 按顺序匹配, 较长的标识在前
+_MAGICS = [
+    (b'r3d2Mesh', 'scb'),
+    (b'r3d2sklt', 'skl'),
+    (b'r3d2anmd', 'anm'),
+    (b'r3d2canm', 'anm'),
+    (b'r3d2', 'wpk'),
+    (b'BKHD', 'bnk'),
+    (b'PROP', 'bin'),
+    (b'PTCH', 'bin'),
+    (b'RIFF', 'wem'),
+    (b'OggS', 'ogg'),
+    (b'DDS ', 'dds'),
+    (b'TEX\0', 'tex'),
+    (b'RW', 'wad'),
+    (b'\x89PNG', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x33\x22\x11\x00', 'skn'),
+    (b'OEGM', 'mapgeo'),
+    (b'[ObjectBegin]', 'sco'),
+    (b'PreLoad', 'preload'),
+]
+
+
+class _ChunkReader:
+    """
+    将分块迭代器包装为只有 read 方法的文件对象, 供 zstandard.stream_reader 使用
+    """
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = b''
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._buffer:
+            self._buffer = bytes(next(self._chunks, b''))
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _iter_zstd_frames(read: Callable[[int, int], bytes], end: int) -> Iterator[Tuple[int, int, Optional[int]]]:
+    """
+    按 zstd 帧头逐个切分连续的多个帧, 只读取帧头与块头, 不解压数据
+    https://github.com/facebook/zstd/blob/dev/doc/zstd_compression_format.md#frames
+
+    :param read: read(偏移, 长度) 返回该位置的数据
+    :param end: 数据长度
+    :return: (起点, 终点, 解压大小), 帧头未记录解压大小时为 None
+    """
+    pos = 0
+    while pos < end:
+        start = pos
+        # 帧头最长 18 字节: 标识 4, 描述符 1, 窗口 1, 字典 ID 4, 内容大小 8
+        head = read(pos, 18)
+        magic = int.from_bytes(head[:4], 'little')
+        if magic & 0xFFFFFFF0 == 0x184D2A50:
+            # skippable frame
+            pos += 8 + int.from_bytes(head[4:8], 'little')
+            continue
+        if magic != _ZSTD_MAGIC:
+            raise ValueError(f'无效的 zstd 帧头, 偏移: {pos}, 缺少 subchunktoc 时无法解析未压缩子块')
+
+        descriptor = head[4]
+        fcs_flag = descriptor >> 6
+        single_segment = descriptor >> 5 & 1
+        checksum = descriptor >> 2 & 1
+        dict_id_size = (0, 1, 2, 4)[descriptor & 3]
+        fcs_size = (single_segment, 2, 4, 8)[fcs_flag]
+        header_size = 5 + (not single_segment) + dict_id_size
+
+        size = None
+        if fcs_size:
+            size = int.from_bytes(head[header_size:header_size + fcs_size], 'little') + (256 if fcs_size == 2 else 0)
+        pos += header_size + fcs_size
+
+        while True:
+            header = int.from_bytes(read(pos, 3), 'little')
+            block_type = header >> 1 & 3
+            pos += 3 + (1 if block_type == 1 else header >> 3)
+            if header & 1:
+                break
+            if pos >= end:
+                raise ValueError('zstd 帧不完整')
+        pos += 4 * checksum
+        yield start, pos, size
+
+
+def _zstd_frames(data: bytes, count: Optional[int] = None) -> List[Tuple[int, int, Optional[int]]]:
+    """
+    按 zstd 帧头切分内存中连续的多个帧, 见 _iter_zstd_frames
+
+    :param data: 数据
+    :param count: 最多切分的帧数量, 为空时切分全部数据
+    :return: [(起点, 终点, 解压大小), ...], 帧头未记录解压大小时为 None
+    """
+    return list(islice(_iter_zstd_frames(lambda pos, length: data[pos:pos + length], len(data)), count))
+
+
 @dataclass
 class WADSection:
     """
@@ -54,6 +271,56 @@ class WADSection:
         self.type = self.type & 0xF
 
 
+@dataclass
+class DedupeReport:
+    """
+    提取时重复条目的统计
+
+    :param duplicates: 与其他条目内容相同、未重复解压的条目数量。
+    :param bytes_saved: 省去的解压字节数。
+    :param disk_saved: 通过硬链接或 reflink 省去的磁盘占用(字节)。
+    :param modes: 各输出方式的数量, 如 {'hardlink': 10, 'copy': 2}。
+    """
+    duplicates: int = 0
+    bytes_saved: int = 0
+    disk_saved: int = 0
+    modes: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class IncrementalReport:
+    """
+    增量提取结果
+
+    :param added: 新增条目的哈希。
+    :param modified: 内容或输出路径发生变化的条目的哈希。
+    :param removed: 已不存在的条目的哈希。
+    :param failed: 提取失败的条目的哈希, 不写入清单, 下次重新提取。
+    :param unchanged: 未变化、跳过的条目数量。
+    """
+    added: List[int] = field(default_factory=list)
+    modified: List[int] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)
+    failed: List[int] = field(default_factory=list)
+    unchanged: int = 0
+
+
+@dataclass
+class WADDiff:
+    """
+    两个 WAD 的 TOC 对比结果, 均为路径哈希
+
+    :param added: 只存在于新 WAD 的条目。
+    :param removed: 只存在于旧 WAD 的条目。
+    :param modified: 内容发生变化的条目。
+    :param unchanged: 内容未变化的条目。
+    """
+    added: List[int] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)
+    modified: List[int] = field(default_factory=list)
+    unchanged: List[int] = field(default_factory=list)
+
+
 class WadHeaderAnalyzer(SectionNoId):
     """
     文件头分析
@@ -84,6 +351,13 @@ class WadHeaderAnalyzer(SectionNoId):
         else:
             self.header_size += self.file_count * 32
 
+    def _toc_struct(self) -> struct.Struct:
+        """
+        TOC 单条记录的结构
+        :return:
+        """
+        return get_struct('<' + ''.join(code for _, code in (_TOC_V1 if self.version[0] == 1 else _TOC_V2)))
+
     def _v1(self):
         _entry_header_offset, _entry_header_cell_size, file_count = self._data.customize('<HHL', False)
         self.header_size += 8
@@ -110,14 +384,201 @@ class WadHeaderAnalyzer(SectionNoId):
 
 
 class WAD(WadHeaderAnalyzer):
+    """
+    WAD 文件解析
+
+    按哈希查询条目有两种方式:
+        dict: 首次查询时构建 path_hash -> TOC 行号 的字典, 之后 O(1) 查询
+        bisect: 不构建任何索引, 直接在有序的 TOC 哈希列上二分查找(仅 v2/v3, TOC 按哈希排序)
+    """
+
+    # 提取时合并相邻读取的最大间隔以及单次读取的最大长度
+    coalesce_gap = 64 * 1024
+    coalesce_size = 4 * 1024 * 1024
+
+    # 类型 4 条目解压大小超过该值时, 子块并行解压
+    subchunk_parallel_size = 4 * 1024 * 1024
+    # 未安装 zstandard 时无法增量解压, sniff 只整体解压不超过该大小的第一个 zstd 帧, 更大的条目视为无法识别
+    sniff_frame_size = 256 * 1024
+    # 流式解压的缓冲区大小, 解压大小超过该值的条目写入磁盘时逐块解压写入, 限制单个线程的内存占用
+    buffer_size = 8 * 1024 * 1024
+
+    # 未提供 cache 时, 重定向目标数据使用的缓存大小
+    redirect_cache_size = 64 * 1024 * 1024
+
+    def __init__(self, data, index_mode: str = 'dict', cache: Optional[ByteLRUCache] = None, index=None):
+        """
+        :param data: 文件路径、字节数据或 BinaryReader
+        :param index_mode: 哈希查询方式, dict 或 bisect
+        :param cache: 解压数据缓存, 可在同一文件的多个 WAD 实例之间共享
+        :param index: WadIndex, 重定向目标不在当前 WAD 中时用于跨 WAD 查找
+        """
+        if index_mode not in ('dict', 'bisect'):
+            raise ValueError(f'不支持的索引方式: {index_mode}')
+        self.index_mode = index_mode
+        self.cache = cache
+        self.index = index
+        # 重定向解析结果: path_hash -> (WAD, 目标条目), 以及通过索引打开的其他 WAD
+        self._redirects: Dict[int, Tuple['WAD', WADSection]] = {}
+        self._redirect_wads: Dict[Path, 'WAD'] = {}
+        self._redirect_cache: Optional[ByteLRUCache] = None
+        self._redirect_lock = threading.Lock()
+        self.file = Path(data) if isinstance(data, (str, os.PathLike)) else None
+        self._identity = None
+        self.dedupe_report = DedupeReport()
+        self._hash_index: Optional[Dict[int, int]] = None
+        # None 表示尚未尝试加载
+        self._subchunk_toc = None
+        super().__init__(data)
 
     def _read(self):
         super()._read()
 
         if self.version[0] == 1:
-            self.files = [WADSection(*self._data.customize("<QIIII", False)) for _ in range(self.file_count)]
+            toc = _TOC_V1
         else:
-            self.files = [WADSection(*self._data.customize("<QIIIB?HQ", False)) for _ in range(self.file_count)]
+            toc = _TOC_V2
+        # 列式保存整个 TOC, WADSection 仅在访问时构造
+        self.toc = self._data.read_records(toc, self.file_count)
+        self.files = RecordList(self.toc, WADSection)
+
+    @property
+    def identity(self) -> Tuple:
+        """
+        文件标识, 作为缓存键的一部分
+        同一文件(路径、大小、修改时间相同)的多个实例标识相同, 字节数据等无路径的实例各自使用不重复的序号
+        :return:
+        """
+        if self._identity is None:
+            if self.file is not None:
+                stat = os.stat(self.file)
+                self._identity = (os.path.realpath(self.file), stat.st_size, stat.st_mtime_ns)
+            else:
+                self._identity = (None, next(_instance_ids))
+        return self._identity
+
+    @property
+    def hash_index(self) -> Dict[int, int]:
+        """
+        path_hash -> TOC 行号, 首次访问时构建
+        :return:
+        """
+        if self._hash_index is None:
+            hashes = self.toc['path_hash'].tolist()
+            self._hash_index = dict(zip(hashes, range(len(hashes))))
+        return self._hash_index
+
+    def _use_bisect(self) -> bool:
+        return self.index_mode == 'bisect' and self.version[0] > 1 and self._hash_index is None
+
+    def _find_row(self, path_hash: int) -> int:
+        """
+        查询哈希对应的 TOC 行号
+        :param path_hash:
+        :return: 行号, 不存在返回 -1
+        """
+        if self._use_bisect():
+            column = self.toc['path_hash']
+            row = bisect_left(column, path_hash)
+            if row < len(column) and column[row] == path_hash:
+                return row
+            return -1
+        return self.hash_index.get(path_hash, -1)
+
+    @classmethod
+    def _to_hash(cls, path_or_hash: Union[str, int]) -> int:
+        return cls.get_hash(path_or_hash) if isinstance(path_or_hash, str) else path_or_hash
+
+    def get(self, path_or_hash: Union[str, int], default=None) -> Optional[WADSection]:
+        """
+        根据路径或哈希获取文件条目
+
+        :param path_or_hash: 文件路径或路径哈希。
+        :param default: 不存在时的返回值。
+        :return: WADSection
+        """
+        row = self._find_row(self._to_hash(path_or_hash))
+        if row == -1:
+            return default
+        return self.files[row]
+
+    def lookup(self, hashes: Iterable[Union[str, int]]) -> List[Optional[WADSection]]:
+        """
+        批量查询, 结果顺序与输入一致, 不存在的为 None
+
+        :param hashes: 文件路径或路径哈希列表。
+        :return:
+        """
+        hashes = [self._to_hash(item) for item in hashes]
+        column = self.toc['path_hash']
+        if self._use_bisect() and numpy is not None and isinstance(column, numpy.ndarray) and hashes:
+            # 向量化二分查找
+            targets = numpy.asarray(hashes, dtype=column.dtype)
+            rows = numpy.searchsorted(column, targets)
+            found = rows < len(column)
+            found[found] = column[rows[found]] == targets[found]
+            return [self.files[row] if ok else None for row, ok in zip(rows.tolist(), found.tolist())]
+
+        if self._use_bisect():
+            rows = [self._find_row(item) for item in hashes]
+        else:
+            index = self.hash_index
+            rows = [index.get(item, -1) for item in hashes]
+        return [None if row == -1 else self.files[row] for row in rows]
+
+    def __contains__(self, path_or_hash: Union[str, int]) -> bool:
+        return self._find_row(self._to_hash(path_or_hash)) != -1
+
+    def load_subchunk_toc(self, source: Union[str, int, bytes, None] = None) -> bool:
+        """
+        加载子块表(subchunktoc), 类型 4 条目解压时使用。
+        每条记录 16 字节: uint32 压缩大小, uint32 解压大小, uint64 校验和,
+        条目通过 first_subchunk_index 与 subchunk_count 引用其中的连续记录。
+
+        :param source: subchunktoc 在 WAD 中的路径或哈希, 或者其内容;
+            为空时根据 WAD 文件路径推断, 如 DATA/FINAL/Champions/Aatrox.wad.client 对应
+            data/final/champions/aatrox.wad.subchunktoc
+        :return: 是否加载成功
+        """
+        if source is None:
+            source = self._subchunk_toc_path()
+            if source is None:
+                return False
+
+        if isinstance(source, (str, int)):
+            section = self.get(source)
+            if section is None:
+                return False
+            source = self.extract_by_section(section, None, raw=True)
+            if source is None:
+                return False
+
+        self._subchunk_toc = BinaryReader(source).read_records(_SUBCHUNK_TOC, len(source) // 16)
+        return True
+
+    def _subchunk_toc_path(self) -> Optional[str]:
+        if self.file is None:
+            return None
+        return _subchunk_toc_name(self.file)
+
+    def subchunks_of(self, file: WADSection) -> Optional[List[Tuple[int, int]]]:
+        """
+        获取类型 4 条目的子块记录, 首次调用时自动尝试加载 subchunktoc。
+
+        :param file: WADSection 对象。
+        :return: [(压缩大小, 解压大小), ...], 无子块表时返回 None
+        """
+        if file.type != 4:
+            return None
+        if self._subchunk_toc is None and not self.load_subchunk_toc():
+            # 标记已尝试, 避免重复推断
+            self._subchunk_toc = ()
+        if not len(self._subchunk_toc):
+            return None
+        start = file.first_subchunk_index
+        if start + file.subchunk_count > len(self._subchunk_toc):
+            return None
+        return [get_record(self._subchunk_toc, i)[:2] for i in range(start, start + file.subchunk_count)]
 
     @staticmethod
     def get_hash(path: str) -> int:
@@ -127,36 +588,613 @@ class WAD(WadHeaderAnalyzer):
         :param path: 文件路径字符串。
         :return: 64位哈希值。
         """
-        xx = xxhash.xxh64()
-        xx.update(path.lower().encode('utf-8'))
-        return xx.intdigest()
+        return xxhash.xxh64_intdigest(path.lower().encode('utf-8'))
+
+    @classmethod
+    def match_hashes(cls, candidates: Iterable[str], targets: Union['WAD', Iterable[Union['WAD', int]]],
+                     workers: Optional[int] = None, chunk_size: int = 65536) -> Iterator[Tuple[int, str]]:
+        """
+        批量计算候选路径的哈希, 只输出命中目标哈希的路径, 用于猜测未知路径。
+
+        候选路径按块分发到进程池计算, 目标集合在每个子进程中只传递一次;
+        候选路径是惰性读取的, 同一时间只有少量块在处理, 可以传入生成器处理数千万条路径。
+
+        :param candidates: 候选路径。
+        :param targets: 目标, WAD、WAD 列表或路径哈希。
+        :param workers: 进程数量, 为 1 时在当前进程顺序执行, 为 None 时由 concurrent.futures 决定。
+        :param chunk_size: 每块的路径数量。
+        :return: (path_hash, 路径) 迭代器, 按候选顺序输出, 重复的候选路径会重复输出。
+        """
+        if isinstance(targets, WAD):
+            targets = [targets]
+        hashes = set()
+        for target in targets:
+            if isinstance(target, WAD):
+                hashes.update(int(path_hash) for path_hash in target.toc['path_hash'])
+            else:
+                hashes.add(target)
+        hashes = frozenset(hashes)
+
+        it = iter(candidates)
+        chunks = iter(lambda: list(islice(it, chunk_size)), [])
+        if workers == 1:
+            for chunk in chunks:
+                yield from _match_chunk(chunk, hashes)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_match, initargs=(hashes,)) as executor:
+            pending = deque()
+            limit = 2 * (workers or os.cpu_count() or 1)
+            for chunk in chunks:
+                pending.append(executor.submit(_match_chunk, chunk))
+                if len(pending) >= limit:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
 
     @classmethod
-    def _decompress_subchunks(cls, file: WADSection, data: BinaryReader) -> bytes:
+    def _decompress_subchunks(cls, file: WADSection, data: bytes,
+                              subchunks: Optional[List[Tuple[int, int]]] = None) -> Union[bytes, memoryview]:
         """
         解压缩类型为 4 的文件（包含子块）。
 
+        子块信息优先使用 subchunktoc 中的记录(压缩大小, 解压大小), 压缩大小与解压大小相同的子块为未压缩数据;
+        没有 subchunktoc 时按 zstd 帧头切分(此时所有子块都必须为 zstd 帧)。
+        各子块相互独立, 较大的文件在共享线程池中并行解压, 结果直接写入预分配的缓冲区。
+
         :param file: 要解压缩的 WADSection 对象。
-        :param data: BinaryReader。
-        :return: 解压缩后的数据。
-        """
-        offset = 0
-        decompressed_data = bytearray()
-        for _ in range(file.subchunk_count):
-            # 每个子块的头部包含压缩大小和未压缩大小
-            data.skip(offset)
-            subchunk_header = data.customize('<II')
-            comp_size, uncomp_size = subchunk_header
-            offset += 8  # 跳过头部
-            subchunk_data = data[offset:offset + comp_size]
-            offset += comp_size
-
-            if comp_size == uncomp_size:
-                decompressed_data.extend(subchunk_data)
+        :param data: 压缩数据。
+        :param subchunks: 该文件的子块记录 [(压缩大小, 解压大小), ...]。
+        :return: 解压缩后的数据, 预分配时返回缓冲区的只读 memoryview, 不再复制, 也不会被调用方或缓存的其他使用者修改。
+        """
+        if subchunks is None:
+            subchunks = [(end - start, size) for start, end, size in _zstd_frames(data)]
+
+        # (输入起点, 输入终点, 输出起点, 输出终点)
+        spans = []
+        src = dst = 0
+        for comp_size, uncomp_size in subchunks:
+            if dst is None or uncomp_size is None:
+                spans.append((src, src + comp_size, None, None))
+                dst = None
             else:
-                decompressed_data.extend(zstd.decompress(subchunk_data))
+                spans.append((src, src + comp_size, dst, dst + uncomp_size))
+                dst += uncomp_size
+            src += comp_size
+
+        if src != len(data):
+            raise ValueError(f'子块大小与数据长度不一致: {src} != {len(data)}')
+
+        view = memoryview(data)
+        if dst is None:
+            # 帧头中没有记录解压大小, 无法预分配, 只能顺序解压
+            return b''.join(zstd.decompress(bytes(view[a:b])) for a, b, _, _ in spans)
+
+        if dst != file.size:
+            raise ValueError(f'子块解压大小与条目大小不一致: {dst} != {file.size}')
+
+        out = bytearray(dst)
+
+        def work(span):
+            a, b, c, d = span
+            chunk = view[a:b]
+            if b - a != d - c:
+                chunk = zstd.decompress(bytes(chunk))
+                if len(chunk) != d - c:
+                    raise ValueError(f'子块解压大小错误: {len(chunk)} != {d - c}')
+            out[c:d] = chunk
+
+        if len(spans) > 1 and file.size >= cls.subchunk_parallel_size:
+            list(_subchunk_executor().map(work, spans))
+        else:
+            for span in spans:
+                work(span)
+        return memoryview(out).toreadonly()
+
+    @classmethod
+    def decompress(cls, file: WADSection, compressed_data: bytes,
+                   subchunks: Optional[List[Tuple[int, int]]] = None) -> Optional[Union[bytes, memoryview]]:
+        """
+        按条目类型解压数据, 不涉及任何文件读取, 可在线程或进程中调用。
+
+        :param file: WADSection 对象。
+        :param compressed_data: 压缩数据。
+        :param subchunks: 类型 4 条目的子块记录, 见 subchunks_of。
+        :return: 解压后的数据, 重定向条目返回 None; 类型 4 条目为只读 memoryview, 见 _decompress_subchunks。
+        """
+        # https://github.com/Pupix/lol-wad-parser/blob/2de5a9dafb77b7165b568316d5c1b1f8b5e898f2/lib/extract.js#L11
+        # https://github.com/CommunityDragon/CDTB/blob/2663610ed10a2f5fdeeadc5860abca275bcd6af6/cdragontoolbox/wad.py#L82
+        if file.type == 0:
+            return compressed_data
+        elif file.type == 1:
+            return gzip.decompress(compressed_data)
+        elif file.type == 2:
+            logger.debug(f'文件重定向: {cls._parse_redirect(compressed_data)}')
+            return None
+        elif file.type == 3:
+            return zstd.decompress(compressed_data)
+        elif file.type == 4:
+            return cls._decompress_subchunks(file, compressed_data, subchunks)
+        else:
+            raise ValueError(f"不支持的文件类型: {file.type}")
+
+    @staticmethod
+    def _parse_redirect(data: bytes) -> str:
+        """
+        解析重定向(类型 2)条目的数据
+        :param data: 条目数据
+        :return: 目标路径
+        """
+        data_reader = BinaryReader(data)
+        n = data_reader.customize('<L')
+        data_reader.skip(4)
+        return data_reader.bytes(4 + n).rstrip(b'\0').decode('utf-8')
+
+    def redirect_target(self, file: WADSection, data: Optional[bytes] = None) -> str:
+        """
+        获取重定向条目的目标路径
+        :param file: 类型为 2 的 WADSection
+        :param data: 已读取的条目数据
+        :return:
+        """
+        if file.type != 2:
+            raise ValueError(f'不是重定向条目: {file.path_hash:016x}')
+        return self._parse_redirect(data if data else self.read_compressed(file))
+
+    def _open_redirect_wad(self, path: Path) -> 'WAD':
+        if self.file is not None and Path(path) == self.file:
+            return self
+        with self._redirect_lock:
+            if (wad := self._redirect_wads.get(path)) is None:
+                wad = self._redirect_wads[path] = WAD(path, cache=self.cache, index=self.index)
+        return wad
+
+    def resolve_redirect(self, file: WADSection, data: Optional[bytes] = None) -> Tuple['WAD', WADSection]:
+        """
+        沿重定向链查找最终条目, 先在当前 WAD 中查找, 找不到时通过 index 在其他 WAD 中查找, 结果会被缓存。
+
+        :param file: 类型为 2 的 WADSection。
+        :param data: 已读取的条目数据。
+        :return: (最终条目所在的 WAD, 最终条目)
+        """
+        if (resolved := self._redirects.get(file.path_hash)) is not None:
+            return resolved
+
+        wad, current = self, file
+        seen = set()
+        while current.type == 2:
+            key = (wad.identity, current.path_hash)
+            if key in seen:
+                raise ValueError(f'重定向循环: {file.path_hash:016x}')
+            seen.add(key)
+            if wad is not self and (resolved := wad._redirects.get(current.path_hash)) is not None:
+                wad, current = resolved
+                break
+
+            target = wad.redirect_target(current, data if current is file else None)
+            section = wad.get(target)
+            if section is None and wad is not self:
+                section = self.get(target)
+                wad = self if section is not None else wad
+            if section is None:
+                found = self.index.find(target) if self.index is not None else None
+                if found is None:
+                    raise FileNotFoundError(f'重定向目标不存在: {target}')
+                # 索引中的偏移可能已过期, 按路径哈希在重新读取的 TOC 中查找
+                wad = self._open_redirect_wad(found[0])
+                section = wad.get(found[1].path_hash)
+                if section is None:
+                    raise FileNotFoundError(f'重定向目标不存在, 索引可能已过期: {target}, {found[0]}')
+            current = section
+
+        self._redirects[file.path_hash] = wad, current
+        return wad, current
+
+    def _extract_redirect(self, file: WADSection, file_path: StrPath, raw: bool, data: Optional[bytes] = None):
+        """
+        提取重定向条目, 同一目标只解压一次; 写入磁盘且目标较大时流式写入, 不经过缓存
+        """
+        wad, target = self.resolve_redirect(file, data)
+        if wad._streams(target, raw):
+            return wad._stream_to_file(target, file_path)
+        cache = self.cache
+        if cache is None:
+            with self._redirect_lock:
+                if self._redirect_cache is None:
+                    self._redirect_cache = ByteLRUCache(self.redirect_cache_size)
+            cache = self._redirect_cache
+        key = (wad.identity, target.path_hash)
+        if (content := cache.get(key)) is None:
+            content = wad.extract_by_section(target, None, raw=True)
+            if content is None:
+                return None
+            cache.put(key, content)
+        return content if raw else self._save(content, file_path)
+
+    @classmethod
+    def _decompress_safe(cls, file: WADSection, compressed_data: bytes,
+                         subchunks: Optional[List[Tuple[int, int]]] = None) -> Optional[Union[bytes, memoryview]]:
+        try:
+            return cls.decompress(file, compressed_data, subchunks)
+        except Exception as e:
+            logger.error(f"解压缩文件失败: {e}")
+            return None
+
+    @classmethod
+    def _decompress_batch(cls, items: List[Tuple[WADSection, bytes, Optional[List[Tuple[int, int]]]]]) -> List:
+        # memoryview 无法 pickle, 返回主进程前转换为 bytes
+        return [bytes(data) if isinstance(data, memoryview) else data
+                for data in (cls._decompress_safe(*item) for item in items)]
+
+    def read_compressed(self, file: WADSection) -> bytes:
+        """
+        按位置读取条目的原始(压缩)数据, 不使用共享指针, 线程安全。
+
+        :param file: WADSection 对象。
+        :return:
+        """
+        return self._data.pread(file.offset, file.compressed_size)
+
+    def _iter_compressed(self, file: WADSection, data: Optional[bytes] = None,
+                         chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        """
+        按 buffer_size 分块读取条目的压缩数据
+        :param file: WADSection 对象。
+        :param data: 已读取的压缩数据, 为空时按位置分块读取。
+        :param chunk_size: 块大小, 默认为 buffer_size。
+        :return:
+        """
+        size = chunk_size or self.buffer_size
+        if data is not None:
+            view = memoryview(data)
+            for pos in range(0, len(view), size):
+                yield view[pos:pos + size]
+            return
+        for pos in range(0, file.compressed_size, size):
+            yield self._data.pread(file.offset + pos, min(size, file.compressed_size - pos))
+
+    def iter_decompressed(self, file: WADSection, data: Optional[bytes] = None,
+                          chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        """
+        流式解压, 逐块返回解压后的数据, 每块不超过 buffer_size。
+
+        gzip 使用 zlib 增量解压; zstd 需要安装 zstandard, 否则退化为整体解压后再分块返回;
+        类型 4 逐个子块解压, 内存占用不超过单个子块大小。
+        重定向(类型 2)条目没有数据, 不返回任何内容。
+
+        :param file: WADSection 对象。
+        :param data: 已读取的压缩数据, 为空时从文件中按位置分块读取。
+        :param chunk_size: 块大小, 默认为 buffer_size。
+        :return:
+        """
+        size = chunk_size or self.buffer_size
+        if file.type == 0:
+            yield from self._iter_compressed(file, data, size)
 
-        return bytes(decompressed_data)
+        elif file.type == 1:
+            d = zlib.decompressobj(31)
+            for chunk in self._iter_compressed(file, data, size):
+                while chunk:
+                    if out := d.decompress(chunk, size):
+                        yield out
+                    if d.eof:
+                        # 多个 gzip 成员
+                        chunk, d = d.unused_data, zlib.decompressobj(31)
+                    else:
+                        chunk = d.unconsumed_tail
+            if tail := d.flush():
+                yield tail
+
+        elif file.type == 3:
+            if zstandard is None:
+                full = zstd.decompress(data if data is not None else self.read_compressed(file))
+                for pos in range(0, len(full), size):
+                    yield full[pos:pos + size]
+                return
+            reader = zstandard.ZstdDecompressor().stream_reader(
+                _ChunkReader(self._iter_compressed(file, data, size)), read_size=size, read_across_frames=True)
+            while chunk := reader.read(size):
+                yield chunk
+
+        elif file.type == 4:
+            subchunks = self.subchunks_of(file)
+            if subchunks is None and data is None:
+                # 没有 subchunktoc 时按位置读取帧头切分, 每次只读取并解压一个帧
+                read = lambda pos, length: self._data.pread(file.offset + pos, min(length, file.compressed_size - pos))
+                for start, end, _ in _iter_zstd_frames(read, file.compressed_size):
+                    yield zstd.decompress(self._data.pread(file.offset + start, end - start))
+                return
+            if subchunks is None:
+                subchunks = [(end - start, frame_size) for start, end, frame_size in _zstd_frames(data)]
+            offset = 0
+            for comp_size, uncomp_size in subchunks:
+                if data is not None:
+                    chunk = bytes(data[offset:offset + comp_size])
+                else:
+                    chunk = self._data.pread(file.offset + offset, comp_size)
+                offset += comp_size
+                yield chunk if comp_size == uncomp_size else zstd.decompress(chunk)
+
+        elif file.type != 2:
+            raise ValueError(f"不支持的文件类型: {file.type}")
+
+    def _head(self, file: WADSection, size: int) -> bytes:
+        """
+        只解压条目开头的一部分数据
+        zstd 与 gzip 按块读取压缩数据并增量解压, 得到足够的数据后停止; 类型 4 只解压第一个子块.
+        未安装 zstandard 时只读取不超过 sniff_frame_size 的数据并整体解压其中第一个帧,
+        第一个帧更大、或帧头未记录解压大小、或解压大小超过 buffer_size 的条目返回空数据(视为无法识别)
+        :param file: WADSection 对象。
+        :param size: 需要的长度, 条目较小时返回的数据可能更短。
+        :return:
+        """
+        step = 16 * 1024
+        if file.type == 0:
+            return self._data.pread(file.offset, min(size, file.compressed_size))
+
+        if file.type == 4:
+            subchunks = self.subchunks_of(file)
+            if subchunks:
+                comp_size, uncomp_size = subchunks[0]
+                if comp_size == uncomp_size:
+                    return self._data.pread(file.offset, min(size, comp_size))
+                if uncomp_size <= step:
+                    return zstd.decompress(self._data.pread(file.offset, comp_size))[:size]
+                # 较大的子块同样只解压开头部分, 见下方 zstd 的处理
+
+        if file.type == 1:
+            d = zlib.decompressobj(31)
+            head = b''
+            for pos in range(0, file.compressed_size, step):
+                head += d.decompress(self._data.pread(file.offset + pos, min(step, file.compressed_size - pos)),
+                                     size - len(head))
+                if len(head) >= size or d.eof:
+                    break
+            return head[:size]
+
+        if file.type not in (3, 4):
+            return b''
+        if file.type == 3 and file.size <= step:
+            return zstd.decompress(self._data.pread(file.offset, file.compressed_size))[:size]
+        if zstandard is None:
+            data = self._data.pread(file.offset, min(file.compressed_size, self.sniff_frame_size))
+            try:
+                start, end, frame_size = _zstd_frames(data, 1)[0]
+            except (ValueError, IndexError):
+                # 第一个帧超出读取范围
+                return b''
+            if frame_size is None or frame_size > self.buffer_size:
+                # 解压大小未知或过大, 不整体解压
+                return b''
+            return zstd.decompress(data[start:end])[:size]
+
+        # 按块读取压缩数据, 只解压出需要的长度
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            _ChunkReader(self._iter_compressed(file, chunk_size=step)), read_size=step, read_across_frames=True)
+        head = b''
+        while len(head) < size:
+            chunk = reader.read(size - len(head))
+            if not chunk:
+                break
+            head += chunk
+        return head
+
+    @staticmethod
+    def guess_extension(data: bytes) -> Optional[str]:
+        """
+        根据文件头标识猜测扩展名
+        :param data: 文件开头的数据
+        :return: 扩展名, 无法识别时返回 None
+        """
+        for magic, extension in _MAGICS:
+            if data.startswith(magic):
+                return extension
+        return None
+
+    @staticmethod
+    def _map_chunks(fn: Callable[[List], List], items: List, workers: Optional[int]) -> List:
+        """
+        将 items 分块后在线程池中逐块执行 fn, 按顺序拼接各块的结果
+        按块提交, 避免大量小任务时线程池调度开销超过任务本身
+        :param fn: 处理一块并返回结果列表的函数
+        :param items:
+        :param workers: 线程数量, 为 1 时在当前线程顺序执行, 为 None 时由 concurrent.futures 决定
+        :return:
+        """
+        if workers == 1:
+            return fn(items)
+        size = max(1, len(items) // ((workers or os.cpu_count() or 1) * 4))
+        chunks = [items[i:i + size] for i in range(0, len(items), size)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return [item for ret in executor.map(fn, chunks) for item in ret]
+
+    def _preload_subchunks(self, files: List[WADSection]):
+        """
+        存在类型 4 条目时提前加载子块表, 避免在线程中重复加载
+        :param files:
+        :return:
+        """
+        file = next((file for file in files if file.type == 4), None)
+        if file is not None:
+            self.subchunks_of(file)
+
+    def sniff(self, files: Optional[Iterable[WADSection]] = None, workers: Optional[int] = None,
+              head_size: int = 64) -> Dict[int, Optional[str]]:
+        """
+        只解压每个条目开头的少量数据, 根据文件头标识猜测类型, 用于在不知道路径时查找音频等文件。
+        未安装 zstandard 时, 第一个 zstd 帧超过 sniff_frame_size 或解压后超过 buffer_size 的条目不解压, 结果为 None。
+
+        :param files: 要识别的条目, 默认为全部条目。
+        :param workers: 线程数量, 为 1 时在当前线程顺序执行, 为 None 时由 concurrent.futures 决定。
+        :param head_size: 每个条目解压的长度。
+        :return: {path_hash: 扩展名}, 重定向条目为 'redirect', 无法识别或读取失败为 None
+        """
+        files = list(self.files if files is None else files)
+        self._preload_subchunks(files)
+
+        def task(chunk):
+            ret = []
+            for file in chunk:
+                if file.type == 2:
+                    ret.append((file.path_hash, 'redirect'))
+                    continue
+                try:
+                    ret.append((file.path_hash, self.guess_extension(self._head(file, head_size))))
+                except Exception as e:
+                    logger.debug(f'识别文件类型失败: {file.path_hash:016x}, {e}')
+                    ret.append((file.path_hash, None))
+            return ret
+
+        return dict(self._map_chunks(task, files, workers))
+
+    def _check_bounds(self, file: WADSection) -> str:
+        """
+        只检查 TOC 记录本身: 类型、数据范围、大小是否自洽
+        :param file:
+        :return: 状态, 见 verify
+        """
+        if file.type > 4:
+            return 'type'
+        if file.offset < self.header_size or file.offset + file.compressed_size > self._data.end:
+            return 'bounds'
+        if file.type == 0 and file.compressed_size != file.size:
+            return 'size'
+        if file.type == 4:
+            if not file.subchunk_count:
+                return 'size'
+            subchunks = self.subchunks_of(file)
+            if subchunks is not None and (sum(c for c, _ in subchunks) != file.compressed_size or
+                                          sum(u for _, u in subchunks) != file.size):
+                return 'size'
+        return 'ok'
+
+    def _checksum(self):
+        """
+        条目校验和使用的算法, v3.1 之后为 xxh3_64, 之前为 sha256 的前 8 字节, v1 没有校验和
+        :return: 哈希对象的构造函数与取值函数
+        """
+        if self.version[0] == 1:
+            return None
+        if tuple(self.version) >= (3, 1):
+            return xxhash.xxh3_64, lambda h: h.intdigest()
+        return hashlib.sha256, lambda h: int.from_bytes(h.digest()[:8], 'little')
+
+    def _verify_entry(self, file: WADSection, full: bool) -> str:
+        status = self._check_bounds(file)
+        if status != 'ok' or not full or file.type == 2:
+            return status
+
+        data = self.read_compressed(file) if file.compressed_size <= self.buffer_size else None
+        checksum = self._checksum()
+        if checksum is not None and file.sha256:
+            new, value = checksum
+            h = new()
+            for chunk in self._iter_compressed(file, data):
+                h.update(chunk)
+            stored_ok = value(h) == file.sha256
+        else:
+            stored_ok = True
+
+        # 存储数据的校验和不一致时, 兼容以解压后数据计算校验和的文件
+        h = None if stored_ok else checksum[0]()
+        size = 0
+        try:
+            if data is not None and file.size <= self.buffer_size:
+                # 解压后较小的条目整体解压, 比流式解压快
+                chunks = [self.decompress(file, data, self.subchunks_of(file))]
+            else:
+                chunks = self.iter_decompressed(file, data)
+            for chunk in chunks:
+                size += len(chunk)
+                if h is not None:
+                    h.update(chunk)
+        except Exception:
+            if stored_ok:
+                raise
+            return 'checksum'
+        if size != file.size:
+            return 'size'
+        if h is not None and checksum[1](h) != file.sha256:
+            return 'checksum'
+        return 'ok'
+
+    def verify(self, workers: Optional[int] = None, full: bool = True,
+               files: Optional[Iterable[WADSection]] = None) -> Dict[int, str]:
+        """
+        校验条目, 用于提取前检查文件是否损坏或下载不完整。
+
+        快速模式(full=False)只检查 TOC: 类型是否有效、数据是否超出文件范围、各大小是否自洽, 不读取条目数据;
+        完整模式另外计算存储数据的校验和, 并流式解压检查解压大小。
+
+        :param workers: 线程数量, 同 sniff。
+        :param full: 是否完整校验。
+        :param files: 要校验的条目, 默认为全部条目。
+        :return: {path_hash: 状态}, 状态为
+            ok: 正常;
+            type: 不支持的类型;
+            bounds: 数据超出文件范围;
+            size: 大小不一致;
+            checksum: 校验和不一致;
+            error: 解压失败。
+        """
+        files = list(self.files if files is None else files)
+        self._preload_subchunks(files)
+
+        def task(chunk):
+            ret = []
+            for file in chunk:
+                try:
+                    status = self._verify_entry(file, full)
+                except Exception as e:
+                    logger.debug(f'解压失败: {file.path_hash:016x}, {e}')
+                    status = 'error'
+                ret.append((file.path_hash, status))
+            return ret
+
+        result = dict(self._map_chunks(task, files, workers))
+
+        if bad := sum(status != 'ok' for status in result.values()):
+            logger.warning(f'校验失败: {self.file}, {bad}/{len(result)}')
+        return result
+
+    def _streams(self, file: WADSection, raw: bool) -> bool:
+        """
+        是否流式写入磁盘
+        :param file:
+        :param raw:
+        :return:
+        """
+        return not raw and file.size > self.buffer_size and file.type != 2
+
+    def _stream_to_file(self, file: WADSection, file_path: StrPath, data: Optional[bytes] = None) -> Optional[Path]:
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        logger.debug(f'提取文件: {file_path}')
+        file_path.unlink(missing_ok=True)
+        try:
+            written = 0
+            with open(file_path, 'wb') as f:
+                for chunk in self.iter_decompressed(file, data):
+                    f.write(chunk)
+                    written += len(chunk)
+            if written != file.size:
+                raise ValueError(f'解压大小错误: {written} != {file.size}')
+        except Exception as e:
+            logger.error(f"解压缩文件失败: {e}")
+            file_path.unlink(missing_ok=True)
+            return None
+        return file_path
+
+    @staticmethod
+    def _save(data: bytes, file_path: StrPath) -> Path:
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        logger.debug(f'提取文件: {file_path}')
+        # 先删除, 避免覆盖与其他输出共享的硬链接
+        file_path.unlink(missing_ok=True)
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        return file_path
 
     def extract_by_section(self, file: WADSection, file_path: StrPath, raw: bool = False, data: bytes = None):
         """
@@ -166,90 +1204,792 @@ class WAD(WadHeaderAnalyzer):
         :param file_path: 提取后保存的文件路径。
         :param raw: 是否返回原始数据而不保存到文件。
         :param data: compressed_data
-        :return: 提取的数据（如果 raw 为 True），或者保存的文件路径。
+        :return: 提取的数据（如果 raw 为 True, 类型 4 条目为只读 memoryview），或者保存的文件路径。
         """
 
+        if file.type == 2:
+            try:
+                return self._extract_redirect(file, file_path, raw, data)
+            except Exception as e:
+                logger.error(f'重定向解析失败: {e}')
+                return None
+
+        if self._streams(file, raw):
+            return self._stream_to_file(file, file_path, data)
+
+        cache, key = self.cache, None
+        if cache is not None:
+            key = (self.identity, file.path_hash)
+            if (cached := cache.get(key)) is not None:
+                return cached if raw else self._save(cached, file_path)
+
         if not data:
-            self._data.seek(file.offset, 0)
-            compressed_data = self._data.bytes(file.compressed_size)
+            compressed_data = self.read_compressed(file)
         else:
             compressed_data = data
-        # https://github.com/Pupix/lol-wad-parser/blob/2de5a9dafb77b7165b568316d5c1b1f8b5e898f2/lib/extract.js#L11
-        # https://github.com/CommunityDragon/CDTB/blob/2663610ed10a2f5fdeeadc5860abca275bcd6af6/cdragontoolbox/wad.py#L82
-        try:
-            if file.type == 0:
-                data = compressed_data
-            elif file.type == 1:
-                data = gzip.decompress(compressed_data)
-            elif file.type == 2:
-                data_reader = BinaryReader(compressed_data)
-                n = data_reader.customize('<L')
-                data_reader.skip(4)
-                target = data_reader.bytes(4+n).rstrip(b'\0').decode('utf-8')
-                logger.debug(f'文件重定向: {target}')
-                return None
-            elif file.type == 3:
-                data = zstd.decompress(compressed_data)
-            elif file.type == 4:
-                data = self._decompress_subchunks(file, compressed_data)
-            else:
-                raise ValueError(f"不支持的文件类型: {file.type}")
-        except Exception as e:
-            logger.error(f"解压缩文件失败: {e}")
+        data = self._decompress_safe(file, compressed_data, self.subchunks_of(file))
+        if data is None:
             return None
-
+        if cache is not None:
+            cache.put(key, data)
         if raw:
             return data
         else:
-            file_path = Path(file_path)
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            logger.debug(f'提取文件: {file_path}')
-            with open(file_path, 'wb') as f:
-                f.write(data)
-            return file_path
+            return self._save(data, file_path)
 
-    def extract(self, paths: List[StrPath], out_dir: Union[AnyStr, Callable] = '', raw=False) -> List:
+    def _output_path(self, path: StrPath, out_dir: Union[AnyStr, Callable]) -> Optional[Path]:
+        if callable(out_dir):
+            return out_dir(path)
+        elif out_dir:
+            return Path(out_dir) / path
+        return None
+
+    def _plan_reads(self, tasks: List[Tuple[WADSection, Optional[StrPath]]]) -> List[List[int]]:
         """
-        提取指定路径的文件。
+        按数据偏移排序, 并将间隔不超过 coalesce_gap 的相邻条目合并为一次顺序读取。
+
+        :param tasks: (WADSection, 输出路径) 列表。
+        :return: 每次读取包含的任务下标, 按偏移升序。
+        """
+        order = sorted(range(len(tasks)), key=lambda i: tasks[i][0].offset)
+        groups = []
+        group, start, end = [], 0, 0
+        for i in order:
+            file = tasks[i][0]
+            file_end = file.offset + file.compressed_size
+            if group and file.offset - end <= self.coalesce_gap and max(end, file_end) - start <= self.coalesce_size:
+                group.append(i)
+                end = max(end, file_end)
+            else:
+                if group:
+                    groups.append(group)
+                group, start, end = [i], file.offset, file_end
+        if group:
+            groups.append(group)
+        return groups
+
+    def _group_range(self, group: List[int], tasks: List[Tuple[WADSection, Optional[StrPath]]]) -> Tuple[int, int]:
+        start = tasks[group[0]][0].offset
+        end = max(tasks[i][0].offset + tasks[i][0].compressed_size for i in group)
+        return start, end
+
+    def _read_group(self, group: List[int], tasks: List[Tuple[WADSection, Optional[StrPath]]],
+                    raw: bool = False) -> List[Optional[bytes]]:
+        """
+        一次读取整组条目的原始数据, 再按条目切分。
+        内存映射模式下切片本身就是按位置读取, 直接逐条读取即可; 需要流式写入的条目不预先读取。
+
+        :param group: 任务下标。
+        :param tasks: (WADSection, 输出路径) 列表。
+        :param raw: 是否返回原始数据而不保存到文件。
+        :return: 与 group 对应的压缩数据, 流式写入的条目为 None。
+        """
+        if self._data.zero_copy or len(group) == 1:
+            return [None if self._streams(tasks[i][0], raw) else self.read_compressed(tasks[i][0]) for i in group]
+
+        start, end = self._group_range(group, tasks)
+        blob = self._data.pread(start, end - start)
+        return [blob[tasks[i][0].offset - start:tasks[i][0].offset - start + tasks[i][0].compressed_size]
+                for i in group]
+
+    @staticmethod
+    def _payload_key(file: WADSection) -> Tuple:
+        """
+        条目数据的标识, 标识相同的条目内容相同
+        有校验和时按校验和与大小判断(不同偏移的相同数据), 否则按数据位置判断
+        :param file:
+        :return:
+        """
+        # 重定向条目的内容取决于目标, 只按数据位置判断
+        if file.sha256 and file.type != 2:
+            return 'checksum', file.sha256, file.type, file.compressed_size, file.size
+        return 'offset', file.offset, file.compressed_size
+
+    @staticmethod
+    def _materialize(src: Path, dst: Path, mode: str) -> str:
+        """
+        将已提取的文件复用到另一个输出路径
+        :param src: 已提取的文件
+        :param dst: 目标路径
+        :param mode: hardlink、reflink 或 copy, 不支持时依次退化为 reflink、copy
+        :return: 实际使用的方式
+        """
+        dst = Path(dst)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if dst.exists():
+            dst.unlink()
+        if mode == 'hardlink':
+            try:
+                os.link(src, dst)
+                return 'hardlink'
+            except OSError:
+                pass
+        if mode in ('hardlink', 'reflink') and fcntl is not None:
+            try:
+                with open(src, 'rb') as s, open(dst, 'wb') as d:
+                    fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+                return 'reflink'
+            except OSError:
+                pass
+        shutil.copyfile(src, dst)
+        return 'copy'
+
+    def _extract_sections(self, tasks: List[Tuple[WADSection, Optional[StrPath]]], raw: bool = False,
+                          workers: Optional[int] = 1, use_process: bool = False,
+                          dedupe: Optional[str] = 'reflink') -> List:
+        """
+        提取引擎, 结果顺序与 tasks 一致。
+
+        内容相同的条目(同一数据位置, 或校验和与大小相同)只解压一次:
+        raw 模式下直接返回同一份数据, 否则按 dedupe 将其余输出创建为硬链接、reflink 或复制。
+        统计结果保存在 dedupe_report 中。
+
+        :param tasks: (WADSection, 输出路径) 列表。
+        :param raw: 是否返回原始数据而不保存到文件。
+        :param workers: 线程(进程)数量, 为 1 时在当前线程顺序执行, 为 None 时由 concurrent.futures 决定。
+        :param use_process: 是否使用进程池解压。
+        :param dedupe: 重复条目的输出方式, hardlink、reflink 或 copy, 为 None 时不去重。
+        :return:
+        """
+        if dedupe not in (None, 'hardlink', 'reflink', 'copy'):
+            raise ValueError(f'不支持的去重方式: {dedupe}')
+        self.dedupe_report = DedupeReport()
+        if dedupe is None:
+            return self._run_tasks(tasks, raw, workers, use_process)
+
+        primary = {}
+        unique, duplicates = [], []
+        for i, (file, _) in enumerate(tasks):
+            key = self._payload_key(file)
+            if key in primary:
+                duplicates.append((i, primary[key]))
+            else:
+                primary[key] = len(unique)
+                unique.append(i)
+
+        extracted = self._run_tasks([tasks[i] for i in unique], raw, workers, use_process)
+        results = [None] * len(tasks)
+        for i, result in zip(unique, extracted):
+            results[i] = result
+
+        report = self.dedupe_report
+        for i, j in duplicates:
+            file, file_path = tasks[i]
+            result = extracted[j]
+            report.duplicates += 1
+            if result is None:
+                continue
+            report.bytes_saved += file.size
+            if raw or Path(file_path) == result:
+                results[i] = result
+                continue
+            mode = self._materialize(result, file_path, dedupe)
+            if mode != 'copy':
+                report.disk_saved += file.size
+            report.modes[mode] = report.modes.get(mode, 0) + 1
+            results[i] = Path(file_path)
+        if report.duplicates:
+            logger.debug(f'重复条目: {report}')
+        return results
+
+    def _run_tasks(self, tasks: List[Tuple[WADSection, Optional[StrPath]]], raw: bool = False,
+                   workers: Optional[int] = 1, use_process: bool = False) -> List:
+        """
+        提取引擎, 结果顺序与 tasks 一致。
+
+        读取计划按数据在文件中的偏移排序, 相邻条目合并为大块顺序读取, 并提前发出预读提示,
+        避免按请求顺序或哈希顺序造成随机 I/O。
+        读取均为按位置读取, 不共享指针; 解压与写入在线程池中进行(zstd、gzip 解压时释放 GIL)。
+        use_process 为 True 时解压在进程池中进行, 适合 CPU 密集的场景, 数据需在进程间复制。
+
+        :param tasks: (WADSection, 输出路径) 列表。
+        :param raw: 是否返回原始数据而不保存到文件。
+        :param workers: 线程(进程)数量, 为 1 时在当前线程顺序执行, 为 None 时由 concurrent.futures 决定。
+        :param use_process: 是否使用进程池解压。
+        :return:
+        """
+        groups = self._plan_reads(tasks)
+        for group in groups:
+            start, end = self._group_range(group, tasks)
+            self._data.advise(start, end - start)
+
+        results = [None] * len(tasks)
+        if use_process:
+            # 流式写入与重定向条目在当前进程中处理, 不经过进程池
+            local = lambda file: file.type == 2 or self._streams(file, raw)
+            for i in (i for group in groups for i in group if local(tasks[i][0])):
+                results[i] = self.extract_by_section(tasks[i][0], tasks[i][1], raw)
+            groups = [[i for i in group if not local(tasks[i][0])] for group in groups]
+            groups = [group for group in groups if group]
+            order = [i for group in groups for i in group]
+            compressed = (data for group in groups for data in self._read_group(group, tasks, raw))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # 按批提交并限制在途批次数量, 已读取但未解压、已解压但未保存的数据都不会无限堆积
+                size = min(_PROCESS_BATCH, max(1, len(order) // ((workers or os.cpu_count() or 1) * 4)))
+                limit = 2 * (workers or os.cpu_count() or 1)
+                pending = deque()
+
+                def finish():
+                    batch, future = pending.popleft()
+                    for i, data in zip(batch, future.result()):
+                        results[i] = data if data is None or raw else self._save(data, tasks[i][1])
+
+                it = zip(order, compressed)
+                while True:
+                    items = list(islice(it, size))
+                    if not items:
+                        break
+                    batch = [i for i, _ in items]
+                    args = [(tasks[i][0], data, self.subchunks_of(tasks[i][0])) for i, data in items]
+                    pending.append((batch, executor.submit(self._decompress_batch, args)))
+                    del items, args
+                    if len(pending) >= limit:
+                        finish()
+                while pending:
+                    finish()
+            return results
+
+        def task(chunk):
+            ret = []
+            for group in chunk:
+                for i, data in zip(group, self._read_group(group, tasks, raw)):
+                    ret.append((i, self.extract_by_section(tasks[i][0], tasks[i][1], raw, data)))
+            return ret
+
+        for i, result in self._map_chunks(task, groups, workers):
+            results[i] = result
+        return results
+
+    def extract_many(self, paths: List[StrPath], out_dir: Union[AnyStr, Callable] = '', raw=False,
+                     workers: Optional[int] = None, use_process: bool = False,
+                     dedupe: Optional[str] = 'reflink') -> List:
+        """
+        并行提取指定路径的文件, 参数与 extract 一致。
 
         :param paths: 要提取的文件路径列表。
         :param out_dir: 输出目录或生成输出路径的函数。
         :param raw: 是否返回原始数据而不保存到文件。
+        :param workers: 线程(进程)数量。
+        :param use_process: 是否使用进程池解压。
+        :param dedupe: 重复条目的输出方式, hardlink、reflink 或 copy, 为 None 时不去重。
         :return: 提取结果列表，对应每个输入路径。
         """
         if not out_dir and not raw:
             raise ValueError('out_dir 与 raw 不能同时为空')
 
-        results = []
-        for path in paths:
-            path_hash = self.get_hash(path)
-            matched_file = next((f for f in self.files if f.path_hash == path_hash), None)
-
-            if matched_file:
-                if callable(out_dir):
-                    file_path = out_dir(path)
-                else:
-                    file_path = Path(out_dir) / path
-                result = self.extract_by_section(matched_file, file_path, raw)
-                results.append(result)
+        sections = self.lookup(paths)
+        tasks = []
+        for path, section in zip(paths, sections):
+            if section:
+                tasks.append((section, None if raw else self._output_path(path, out_dir)))
             else:
                 logger.warning(f"未找到路径: {path}")
-                results.append(None)
-        return results
 
-    def extract_hash(self, hashtable: Dict[str, str], out_dir: str = '') -> List:
+        extracted = iter(self._extract_sections(tasks, raw, workers, use_process, dedupe))
+        return [next(extracted) if section else None for section in sections]
+
+    def extract(self, paths: List[StrPath], out_dir: Union[AnyStr, Callable] = '', raw=False) -> List:
+        """
+        提取指定路径的文件。
+
+        :param paths: 要提取的文件路径列表。
+        :param out_dir: 输出目录或生成输出路径的函数。
+        :param raw: 是否返回原始数据而不保存到文件。
+        :return: 提取结果列表，对应每个输入路径。
+        """
+        return self.extract_many(paths, out_dir, raw, workers=1)
+
+    def open(self, path_or_hash: Union[str, int, WADSection]) -> 'WADEntryIO':
+        """
+        以只读、可随机访问的文件对象打开条目, 数据在读取时才解压。
+        可直接传给 BinaryReader 以及 BNK、BIN、WPK 等解析类, 无需先提取到临时文件。
+
+        :param path_or_hash: 文件路径、路径哈希或 WADSection。
+        :return:
+        """
+        file = path_or_hash if isinstance(path_or_hash, WADSection) else self.get(path_or_hash)
+        if file is None:
+            raise FileNotFoundError(f'未找到路径: {path_or_hash}')
+        if file.type == 2:
+            return WADEntryIO(*self.resolve_redirect(file))
+        return WADEntryIO(self, file)
+
+    def resolve_names(self, hashtable: Union[Dict[str, str], HashTable]) -> Dict[int, str]:
+        """
+        查询全部条目的路径
+        :param hashtable: {'hash:10': 'path:str'} 或 HashTable, 后者安装 numpy 时批量查询
+        :return: {path_hash: 路径}, 只包含哈希表中存在的条目
+        """
+        if isinstance(hashtable, HashTable):
+            hashes = self.toc['path_hash']
+            return {int(path_hash): name for path_hash, name in zip(hashes, hashtable.resolve(hashes))
+                    if name is not None}
+        names = {}
+        for file in self.files:
+            if (name := hashtable.get(str(file.path_hash))) is not None:
+                names[file.path_hash] = name
+        return names
+
+    def extract_hash(self, hashtable: Union[Dict[str, str], HashTable], out_dir: str = '',
+                     workers: Optional[int] = 1, use_process: bool = False,
+                     dedupe: Optional[str] = 'reflink') -> List:
         """
         提供哈希表, 解包文件.
-        :param hashtable:  {'hash:10': 'path:str'}
+        :param hashtable:  {'hash:10': 'path:str'} 或 HashTable
         :param out_dir: 输出文件夹
+        :param workers: 线程(进程)数量, 默认顺序执行
+        :param use_process: 是否使用进程池解压
+        :param dedupe: 重复条目的输出方式, hardlink、reflink 或 copy, 为 None 时不去重
         :return:
         """
 
-        ret = []
+        names = self.resolve_names(hashtable)
+        tasks = []
+        for file in self.files:
+            if (path := names.get(file.path_hash)) is not None:
+                tasks.append((file, Path(out_dir) / Path(path).as_posix()))
+        self._extract_sections(tasks, workers=workers, use_process=use_process, dedupe=dedupe)
+        return [file_path for _, file_path in tasks]
+
+    # 增量提取清单版本
+    MANIFEST_VERSION = 1
+
+    @staticmethod
+    def _manifest_record(file: WADSection, rel_path: str) -> List:
+        # 没有校验和时以数据位置代替, 宁可重复提取也不遗漏
+        return [file.sha256 or file.offset, file.size, file.compressed_size, file.type, rel_path]
+
+    def extract_incremental(self, out_dir: StrPath, hashtable: Union[Dict[str, str], HashTable, None] = None,
+                            manifest: Optional[StrPath] = None, prune: bool = False,
+                            workers: Optional[int] = None, dedupe: Optional[str] = 'reflink') -> IncrementalReport:
+        """
+        增量提取。
+
+        在输出目录保存清单(path_hash -> 校验和、大小、输出路径), 再次提取时与当前 TOC 对比,
+        只解压、写入新增或变化的条目(以及输出文件已丢失的条目)。
+
+        :param out_dir: 输出文件夹。
+        :param hashtable: {'hash:10': 'path:str'} 或 HashTable, 为空时提取全部条目, 未知路径以 {hash:016x}.bin 命名。
+        :param manifest: 清单文件路径, 默认为输出目录下的 .{WAD 文件名}.manifest.json。
+        :param prune: 是否删除已不存在条目的输出文件。
+        :param workers: 线程数量。
+        :param dedupe: 重复条目的输出方式, 见 extract_many。
+        :return: IncrementalReport
+        """
+        out_dir = Path(out_dir)
+        if manifest is None:
+            name = self.file.name if self.file is not None else 'wad'
+            manifest = out_dir / f'.{name}.manifest.json'
+        manifest = Path(manifest)
+
+        old = {}
+        if manifest.exists():
+            with open(manifest, encoding='utf-8') as f:
+                content = json.load(f)
+            if content.get('version') == self.MANIFEST_VERSION:
+                old = {int(key, 16): value for key, value in content['entries'].items()}
+
+        report = IncrementalReport()
+        entries, tasks = {}, []
+        names = None if hashtable is None else self.resolve_names(hashtable)
         for file in self.files:
-            if (s := str(file.path_hash)) in hashtable:
-                path = hashtable[s]
-                file_path = Path(out_dir) / Path(path).as_posix()
-                self.extract_by_section(file, file_path)
-                ret.append(file_path)
-        return ret
+            if names is None:
+                rel_path = f'{file.path_hash:016x}.bin'
+            else:
+                name = names.get(file.path_hash)
+                if name is None:
+                    continue
+                rel_path = Path(name).as_posix()
+            record = self._manifest_record(file, rel_path)
+            previous = old.get(file.path_hash)
+            if previous == record and (out_dir / rel_path).exists():
+                entries[file.path_hash] = record
+                report.unchanged += 1
+                continue
+            (report.modified if previous else report.added).append(file.path_hash)
+            tasks.append((file, out_dir / rel_path))
+
+        results = self._extract_sections(tasks, workers=workers, dedupe=dedupe)
+        for (file, file_path), result in zip(tasks, results):
+            if result is None:
+                report.failed.append(file.path_hash)
+            else:
+                entries[file.path_hash] = self._manifest_record(file, file_path.relative_to(out_dir).as_posix())
+
+        current = {record[4] for record in entries.values()}
+        for path_hash, record in old.items():
+            if path_hash in entries or path_hash in report.failed:
+                continue
+            report.removed.append(path_hash)
+            if prune and record[4] not in current:
+                logger.debug(f'删除文件: {record[4]}')
+                (out_dir / record[4]).unlink(missing_ok=True)
+
+        manifest.parent.mkdir(parents=True, exist_ok=True)
+        temp = manifest.with_name(manifest.name + '.tmp')
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': self.MANIFEST_VERSION,
+                'entries': {f'{path_hash:016x}': record for path_hash, record in entries.items()}
+            }, f, separators=(',', ':'))
+        os.replace(temp, manifest)
+        return report
+
+    def _toc_offset(self) -> int:
+        return self.header_size - self._toc_struct().size * self.file_count
+
+    def _toc_digest(self) -> int:
+        """
+        TOC 原始数据的摘要, 用于确认补丁的基础 WAD
+        :return:
+        """
+        toc_offset = self._toc_offset()
+        return xxhash.xxh3_64_intdigest(self._data.pread(toc_offset, self.header_size - toc_offset))
+
+    def diff(self, other: 'WAD') -> WADDiff:
+        """
+        与另一个(新版本) WAD 对比, 只比较 TOC, 不解压任何数据。
+
+        按 path_hash 匹配条目, 以校验和、压缩大小、解压大小与类型判断内容是否变化;
+        任一方没有校验和(v1 或校验和为 0)时, 比较两者的压缩数据。
+
+        :param other: 新版本的 WAD。
+        :return: WADDiff
+        """
+        result = WADDiff()
+        ours = {row[0]: row for row in self.toc.tolist()}
+        for row in other.toc.tolist():
+            path_hash = row[0]
+            old = ours.pop(path_hash, None)
+            if old is None:
+                result.added.append(path_hash)
+                continue
+            old_checksum = old[7] if len(old) > 7 else 0
+            new_checksum = row[7] if len(row) > 7 else 0
+            if old[2:5] != row[2:5]:
+                same = False
+            elif old_checksum and new_checksum:
+                same = old_checksum == new_checksum
+            else:
+                same = self._data.pread(old[1], old[2]) == other._data.pread(row[1], row[2])
+            (result.unchanged if same else result.modified).append(path_hash)
+        result.removed = list(ours)
+        return result
+
+    def make_patch(self, other: 'WAD', output: StrPath) -> WADDiff:
+        """
+        生成从当前 WAD 到新版本 WAD 的补丁。
+
+        补丁保存新版本的文件头与 TOC, 以及新增、变化条目的原始(压缩)数据, 数据原样复制, 不解压、不重新压缩;
+        未变化的条目在应用补丁时从当前 WAD 复制。
+
+        :param other: 新版本的 WAD。
+        :param output: 补丁文件路径。
+        :return: WADDiff
+        """
+        result = self.diff(other)
+        toc_offset = other._toc_offset()
+        records = other.toc.tolist()
+        record = other._toc_struct()
+        payload = set(result.added + result.modified)
+
+        output = Path(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'wb') as f:
+            f.write(_PATCH_HEADER.pack(_PATCH_MAGIC, _PATCH_VERSION, self._toc_digest()))
+            f.write(struct.pack('<L', toc_offset))
+            f.write(other._data.pread(0, toc_offset))
+            f.write(struct.pack('<L', len(records)))
+            for row in records:
+                f.write(record.pack(*row))
+
+            # 以新版本中的偏移与长度标识数据, 共享数据的重复条目只保存一次
+            spans = {(row[1], row[2]) for row in records if row[0] in payload}
+            f.write(struct.pack('<L', len(spans)))
+            for data_offset, length in sorted(spans):
+                f.write(struct.pack('<QL', data_offset, length))
+                f.write(other._data.pread(data_offset, length))
+        return result
+
+    def apply_patch(self, patch: StrPath, output: StrPath) -> Path:
+        """
+        将补丁应用到当前 WAD, 生成新版本的 WAD。
+
+        :param patch: make_patch 生成的补丁文件。
+        :param output: 输出路径, 不能与当前 WAD 相同。
+        :return: 输出路径
+        """
+        output = Path(output)
+        if self.file is not None and output.exists() and output.samefile(self.file):
+            raise ValueError(f'输出路径不能与当前 WAD 相同: {output}')
+
+        reader = BinaryReader(patch)
+        magic, version, digest = reader.read_struct(_PATCH_HEADER)
+        if magic != _PATCH_MAGIC:
+            raise ValueError(f'错误的补丁文件头: {magic}')
+        if version != _PATCH_VERSION:
+            raise ValueError(f'不支持的补丁版本: {version}')
+        if digest != self._toc_digest():
+            raise ValueError('补丁与当前 WAD 不匹配')
+
+        prefix = reader.bytes(reader.customize('<L'))
+        record = WadHeaderAnalyzer(prefix + bytes(_HEADER_MAX_SIZE))._toc_struct()
+        count = reader.customize('<L')
+        records = [list(record.unpack(reader.bytes(record.size))) for _ in range(count)]
+
+        # 补丁中的数据: (新版本中的偏移, 长度) -> 补丁中的偏移
+        payload = {}
+        for _ in range(reader.customize('<L')):
+            data_offset, length = reader.customize('<QL', False)
+            payload[data_offset, length] = reader.buffer.tell()
+            reader.skip(length)
+
+        ours = {row[0]: row for row in self.toc.tolist()}
+        offset = len(prefix) + record.size * count
+        moved: Dict[Tuple[int, int], int] = {}
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'wb') as f:
+            f.write(prefix)
+            f.seek(offset)
+            for row in sorted(records, key=lambda r: r[1]):
+                key = row[1], row[2]
+                if key in moved:
+                    row[1] = moved[key]
+                    continue
+                if key in payload:
+                    data = reader.pread(payload[key], row[2])
+                else:
+                    old = ours.get(row[0])
+                    if old is None:
+                        raise ValueError(f'补丁缺少条目数据: {row[0]:016x}')
+                    data = self._data.pread(old[1], old[2])
+                if len(data) != row[2]:
+                    raise ValueError(f'条目数据长度错误: {row[0]:016x}, {len(data)} != {row[2]}')
+                f.write(data)
+                moved[key] = offset
+                row[1] = offset
+                offset += len(data)
+
+            if offset >= 1 << 32:
+                raise ValueError(f'WAD 文件过大: {offset}')
+            f.seek(len(prefix))
+            for row in records:
+                f.write(record.pack(*row))
+        return output
+
+
+class WADEntryIO(io.RawIOBase):
+    """
+    WAD 条目的只读文件对象, 由 WAD.open 创建
+
+    未压缩(类型 0)条目直接按位置从映射区读取;
+    有子块表的类型 4 条目只解压目标位置所在的子块;
+    其余压缩条目按需流式解压, 只解压到请求的位置为止, 已解压部分保留以支持向前跳转.
+    """
+
+    # 流式解压时每次解压的块大小
+    chunk_size = 64 * 1024
+
+    def __init__(self, wad: WAD, file: WADSection):
+        super().__init__()
+        if file.type == 2:
+            raise ValueError(f'重定向条目无法直接打开: {file.path_hash}')
+        self.wad = wad
+        self.section = file
+        self.size = file.size
+        self._pos = 0
+
+        self._subchunks = None
+        if file.type == 4 and (subchunks := wad.subchunks_of(file)) is not None:
+            # 各子块在压缩数据与解压数据中的起点
+            self._subchunks = subchunks
+            self._src, self._dst = [0], [0]
+            for comp_size, uncomp_size in subchunks:
+                self._src.append(self._src[-1] + comp_size)
+                self._dst.append(self._dst[-1] + uncomp_size)
+            self._chunk_index, self._chunk = -1, b''
+
+        self._decoded = bytearray()
+        self._stream = None
+        if file.type != 0 and self._subchunks is None:
+            self._stream = wad.iter_decompressed(file, chunk_size=self.chunk_size)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f'无效的 whence: {whence}')
+        if pos < 0:
+            raise ValueError(f'无效的偏移: {pos}')
+        self._pos = pos
+        return pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def _read_subchunk(self, index: int) -> bytes:
+        if index != self._chunk_index:
+            comp_size, uncomp_size = self._subchunks[index]
+            data = self.wad._data.pread(self.section.offset + self._src[index], comp_size)
+            self._chunk = data if comp_size == uncomp_size else zstd.decompress(data)
+            self._chunk_index = index
+        return self._chunk
+
+    def _read_range(self, start: int, end: int) -> bytes:
+        if self.section.type == 0:
+            return self.wad._data.pread(self.section.offset + start, end - start)
+
+        if self._subchunks is not None:
+            parts = []
+            while start < end:
+                index = bisect_right(self._dst, start) - 1
+                chunk = self._read_subchunk(index)
+                begin = start - self._dst[index]
+                part = chunk[begin:begin + end - start]
+                parts.append(part)
+                start += len(part)
+            return b''.join(parts)
+
+        while len(self._decoded) < end and self._stream is not None:
+            chunk = next(self._stream, None)
+            if chunk is None:
+                self._stream = None
+                break
+            self._decoded += chunk
+        return bytes(self._decoded[start:end])
+
+    def readinto(self, b) -> int:
+        start = min(self._pos, self.size)
+        end = min(start + len(b), self.size)
+        data = self._read_range(start, end)
+        b[:len(data)] = data
+        self._pos = start + len(data)
+        return len(data)
+
+    def readall(self) -> bytes:
+        return self.read(self.size - min(self._pos, self.size))
+
+    def close(self):
+        self._stream = None
+        self._decoded = bytearray()
+        super().close()
+
+    def __repr__(self):
+        return f'Path_Hash: {self.section.path_hash}, ' \
+               f'Size: {self.size}, ' \
+               f'Position: {self._pos}'
+
+
+class WadToc(WadHeaderAnalyzer):
+    """
+    轻量 WAD 句柄, 仅映射文件头与 TOC, 不解析任何条目
+
+    v2/v3 的 TOC 按 path_hash 排序且记录定长, 查询时直接在原始记录上二分查找,
+    只解码命中的那一条记录; v1 无排序保证, 退化为顺序扫描.
+    适合批量打开大量 WAD 判断"是否包含某文件、位于何处".
+    """
+    __slots__ = [
+        'file',
+        'toc_offset',
+        '_record',
+        '_key'
+    ]
+
+    def __init__(self, file: StrPath):
+        """
+        :param file: WAD 文件路径
+        """
+        self.file = file
+        with open(file, 'rb') as f:
+            super().__init__(f.read(_HEADER_MAX_SIZE))
+            self._record = self._toc_struct()
+            self.toc_offset = self.header_size - self._record.size * self.file_count
+            if self.file_count:
+                mm = mmap.mmap(f.fileno(), self.header_size, access=mmap.ACCESS_READ)
+                self._data = BinaryReader(MemoryBuffer(memoryview(mm), mm))
+        self._key = get_struct('<Q')
+
+    def _hash_at(self, row: int) -> int:
+        return self._key.unpack_from(self._data.buffer.view, self.toc_offset + row * self._record.size)[0]
+
+    def _find_row(self, path_hash: int) -> int:
+        """
+        查询哈希对应的 TOC 行号
+        :param path_hash:
+        :return: 行号, 不存在返回 -1
+        """
+        if not self.file_count:
+            return -1
+
+        if self.version[0] == 1:
+            for row in range(self.file_count):
+                if self._hash_at(row) == path_hash:
+                    return row
+            return -1
+
+        lo, hi = 0, self.file_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._hash_at(mid) < path_hash:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.file_count and self._hash_at(lo) == path_hash:
+            return lo
+        return -1
+
+    def find(self, path_or_hash: Union[str, int]) -> Optional[WADSection]:
+        """
+        根据路径或哈希查询文件条目
+
+        :param path_or_hash: 文件路径或路径哈希。
+        :return: WADSection, 不存在返回 None
+        """
+        row = self._find_row(WAD._to_hash(path_or_hash))
+        if row == -1:
+            return None
+        return WADSection(*self._record.unpack_from(self._data.buffer.view, self.toc_offset + row * self._record.size))
+
+    def records(self) -> List[Tuple]:
+        """
+        按 TOC 顺序返回全部原始记录, 字段顺序与 WADSection 一致, type 为未拆分的原始值
+        :return:
+        """
+        if not self.file_count:
+            return []
+        self._data.seek(self.toc_offset, 0)
+        return self._data.read_records(_TOC_V1 if self.version[0] == 1 else _TOC_V2, self.file_count).tolist()
+
+    def __contains__(self, path_or_hash: Union[str, int]) -> bool:
+        return self._find_row(WAD._to_hash(path_or_hash)) != -1
+
+    def __len__(self):
+        return self.file_count
+
+    def close(self):
+        """
+        释放映射
+        :return:
+        """
+        self._data.buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return f'File: {self.file}, ' \
+               f'Version: {self.version}, ' \
+               f'File_Count: {self.file_count}'
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+# @Author  : Virace
+# @Email   : Virace@aliyun.com
+# @Site    : x-item.com
+# @Software: PyCharm
+# @Create  : 2026/10/18 9:40
+# @Update  : 2026/10/18 9:57
+# @Detail  : 跨 WAD 的持久化全局索引
+
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from loguru import logger
+
+from league_tools.formats.WAD import WAD, WADEntryIO, WADSection, WadToc
+from league_tools.utils.type_hints import StrPath
+
+_SCHEMA_VERSION = '1'
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS wads (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    path_hash INTEGER NOT NULL,
+    wad_id INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    compressed_size INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    type INTEGER NOT NULL,
+    duplicate INTEGER NOT NULL,
+    first_subchunk_index INTEGER,
+    sha256 INTEGER
+);
+CREATE INDEX IF NOT EXISTS entries_path_hash ON entries (path_hash);
+CREATE INDEX IF NOT EXISTS entries_wad_id ON entries (wad_id);
+"""
+_ENTRY_COLUMNS = 'path_hash, offset, compressed_size, size, type, duplicate, first_subchunk_index, sha256'
+_SELECT = 'SELECT wads.path, ' + ', '.join(f'entries.{c}' for c in _ENTRY_COLUMNS.split(', ')) + \
+          ' FROM entries JOIN wads ON wads.id = entries.wad_id'
+# sqlite 单条语句的参数数量上限
+_MAX_VARIABLES = 900
+
+
+def _to_signed(value: Optional[int]) -> Optional[int]:
+    """
+    sqlite 的 INTEGER 为有符号 64 位, 无符号哈希按位转换后存储
+    """
+    if value is not None and value >= 1 << 63:
+        return value - (1 << 64)
+    return value
+
+
+def _to_unsigned(value: Optional[int]) -> Optional[int]:
+    if value is not None and value < 0:
+        return value + (1 << 64)
+    return value
+
+
+def _scan(path: Path) -> Tuple[Path, int, int, List[Tuple]]:
+    """
+    读取单个 WAD 的 TOC, 只映射文件头, 不打开数据区
+    :param path:
+    :return: (路径, 大小, 修改时间, 记录列表)
+    """
+    stat = path.stat()
+    with WadToc(path) as toc:
+        rows = []
+        for row in toc.records():
+            path_hash, offset, compressed_size, size, _type, *extra = row
+            duplicate, first_subchunk_index, sha256 = extra or (False, None, None)
+            rows.append((_to_signed(path_hash), offset, compressed_size, size, _type,
+                         int(duplicate), first_subchunk_index, _to_signed(sha256)))
+    return path, stat.st_size, stat.st_mtime_ns, rows
+
+
+class WadIndex:
+    """
+    整个游戏目录的 WAD 条目索引, 保存在 sqlite 数据库中
+
+    索引记录 path_hash → (WAD 文件, 偏移, 大小, 类型), 按 path_hash 建立 B 树索引,
+    查询为 O(log n), 不需要打开任何 WAD. 更新时以文件大小与修改时间判断 WAD 是否变化,
+    只重新读取变化的 WAD 的 TOC.
+    一个索引文件对应一个游戏目录, update 时会移除该目录下已不存在的 WAD.
+    """
+
+    def __init__(self, index_file: StrPath = ':memory:'):
+        """
+        :param index_file: 索引数据库路径, 默认仅在内存中
+        """
+        self.index_file = index_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(index_file), check_same_thread=False)
+        self._init_schema()
+
+    def _init_schema(self):
+        """
+        创建表结构, 版本不一致时清空重建
+        :return:
+        """
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is not None and row[0] == _SCHEMA_VERSION:
+                return
+            if row is not None:
+                logger.info(f'索引版本不一致, 重建: {self.index_file}')
+            self._conn.execute('DELETE FROM entries')
+            self._conn.execute('DELETE FROM wads')
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (_SCHEMA_VERSION,))
+
+    @staticmethod
+    def discover(root: StrPath) -> List[Path]:
+        """
+        查找目录下的全部 WAD 文件
+        :param root: 目录, 如 Game/DATA/FINAL
+        :return:
+        """
+        root = Path(root)
+        return sorted({*root.rglob('*.wad.client'), *root.rglob('*.wad')})
+
+    def update(self, root: StrPath, workers: Optional[int] = None) -> Dict[str, int]:
+        """
+        扫描目录并更新索引, 大小与修改时间均未变化的 WAD 直接跳过
+        :param root: 目录, 如 Game/DATA/FINAL
+        :param workers: 读取 TOC 的线程数量, 默认为 CPU 数量
+        :return: 统计, {'added', 'updated', 'removed', 'unchanged', 'failed'}
+        """
+        stats = dict(added=0, updated=0, removed=0, unchanged=0, failed=0)
+        root = Path(root).resolve()
+        prefix = root.as_posix().rstrip('/') + '/'
+
+        with self._lock:
+            known = {path: (wad_id, size, mtime) for wad_id, path, size, mtime in
+                     self._conn.execute('SELECT id, path, size, mtime FROM wads')}
+
+        changed = []
+        found = set()
+        for path in self.discover(root):
+            key = path.resolve().as_posix()
+            found.add(key)
+            try:
+                stat = path.stat()
+            except OSError as e:
+                logger.warning(f'无法读取 WAD: {path}, {e}')
+                stats['failed'] += 1
+                continue
+            old = known.get(key)
+            if old is not None and old[1] == stat.st_size and old[2] == stat.st_mtime_ns:
+                stats['unchanged'] += 1
+            else:
+                changed.append(path)
+
+        removed = [wad_id for key, (wad_id, _, _) in known.items() if key.startswith(prefix) and key not in found]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor, self._lock, self._conn:
+            for wad_id in removed:
+                self._conn.execute('DELETE FROM entries WHERE wad_id = ?', (wad_id,))
+                self._conn.execute('DELETE FROM wads WHERE id = ?', (wad_id,))
+            stats['removed'] = len(removed)
+
+            futures = [(path, executor.submit(_scan, path)) for path in changed]
+            for path, future in futures:
+                try:
+                    path, size, mtime, rows = future.result()
+                except Exception as e:
+                    logger.warning(f'读取 WAD 失败: {path}, {e}')
+                    stats['failed'] += 1
+                    continue
+
+                key = path.resolve().as_posix()
+                old = known.get(key)
+                if old is None:
+                    wad_id = self._conn.execute('INSERT INTO wads (path, size, mtime) VALUES (?, ?, ?)',
+                                                (key, size, mtime)).lastrowid
+                    stats['added'] += 1
+                else:
+                    wad_id = old[0]
+                    self._conn.execute('DELETE FROM entries WHERE wad_id = ?', (wad_id,))
+                    self._conn.execute('UPDATE wads SET size = ?, mtime = ? WHERE id = ?', (size, mtime, wad_id))
+                    stats['updated'] += 1
+                self._conn.executemany(
+                    f'INSERT INTO entries (wad_id, {_ENTRY_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    ((wad_id, *row) for row in rows)
+                )
+
+        logger.debug(f'索引更新完成: {root}, {stats}')
+        return stats
+
+    @staticmethod
+    def _section(row: Tuple) -> Tuple[Path, WADSection]:
+        path, path_hash, offset, compressed_size, size, _type, duplicate, first_subchunk_index, sha256 = row
+        return Path(path), WADSection(_to_unsigned(path_hash), offset, compressed_size, size, _type,
+                                      bool(duplicate), first_subchunk_index, _to_unsigned(sha256))
+
+    def find_all(self, path_or_hash: Union[str, int]) -> List[Tuple[Path, WADSection]]:
+        """
+        查询包含该文件的全部 WAD, 同一文件可能存在于多个 WAD 中
+        :param path_or_hash: 文件路径或路径哈希
+        :return: [(WAD 路径, WADSection)], 按 WAD 路径排序
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f'{_SELECT} WHERE path_hash = ? ORDER BY wads.path',
+                (_to_signed(WAD._to_hash(path_or_hash)),)
+            ).fetchall()
+        return [self._section(row) for row in rows]
+
+    def find(self, path_or_hash: Union[str, int]) -> Optional[Tuple[Path, WADSection]]:
+        """
+        查询文件所在的 WAD, 存在于多个 WAD 时返回路径排序后的第一个
+        :param path_or_hash: 文件路径或路径哈希
+        :return: (WAD 路径, WADSection), 不存在返回 None
+        """
+        result = self.find_all(path_or_hash)
+        return result[0] if result else None
+
+    def lookup(self, hashes: Iterable[int]) -> Dict[int, Tuple[Path, WADSection]]:
+        """
+        批量查询
+        :param hashes: 路径哈希
+        :return: {哈希: (WAD 路径, WADSection)}, 不存在的哈希不包含在结果中
+        """
+        keys = list({_to_signed(h) for h in hashes})
+        result = {}
+        with self._lock:
+            for i in range(0, len(keys), _MAX_VARIABLES):
+                chunk = keys[i:i + _MAX_VARIABLES]
+                rows = self._conn.execute(
+                    f'{_SELECT} WHERE path_hash IN ({", ".join("?" * len(chunk))}) ORDER BY wads.path DESC',
+                    chunk
+                ).fetchall()
+                for row in rows:
+                    path, section = self._section(row)
+                    result[section.path_hash] = (path, section)
+        return result
+
+    def open(self, path_or_hash: Union[str, int]) -> WADEntryIO:
+        """
+        打开文件, 见 WAD.open, 重定向条目通过本索引跨 WAD 解析
+        索引只用于定位 WAD, 条目按路径哈希在 WAD 当前的 TOC 中重新查找, WAD 在 update 之后变化时不会读取过期的偏移
+        :param path_or_hash: 文件路径或路径哈希
+        :return:
+        """
+        result = self.find(path_or_hash)
+        if result is None:
+            raise FileNotFoundError(f'未找到路径: {path_or_hash}')
+        path, section = result
+        wad = WAD(path, index=self)
+        current = wad.get(section.path_hash)
+        if current is None:
+            raise FileNotFoundError(f'WAD 中已不存在该文件, 索引可能已过期: {path_or_hash}, {path}')
+        return wad.open(current)
+
+    def wads(self) -> List[Path]:
+        """
+        已索引的 WAD 文件
+        :return:
+        """
+        with self._lock:
+            return [Path(path) for path, in self._conn.execute('SELECT path FROM wads ORDER BY path')]
+
+    def __contains__(self, path_or_hash: Union[str, int]) -> bool:
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM entries WHERE path_hash = ? LIMIT 1',
+                                      (_to_signed(WAD._to_hash(path_or_hash)),)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def close(self):
+        """
+        关闭数据库
+        :return:
+        """
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return f'Index: {self.index_file}, ' \
+               f'Wad_Count: {len(self.wads())}, ' \
+               f'File_Count: {len(self)}'
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+# @Author  : Virace
+# @Email   : Virace@aliyun.com
+# @Site    : x-item.com
+# @Software: PyCharm
+# @Create  : 2026/10/18 14:20
+# @Update  : 2026/10/18 14:20
+# @Detail  : 生成 v3 WAD 文件
+
+import os
+import re
+import struct
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import xxhash
+import zstd
+from loguru import logger
+
+from league_tools.formats.WAD import WAD, WADSection, _HEADER_MAX_SIZE, _subchunk_toc_name
+from league_tools.utils.type_hints import StrPath
+
+# 条目数据来源: 内容、文件路径或返回内容的函数
+Source = Union[bytes, StrPath, Callable[[], bytes]]
+
+_HEADER = struct.Struct('<2sBB256sQL')
+_TOC = struct.Struct('<QIIIB?HQ')
+_SUBCHUNK = struct.Struct('<IIQ')
+# 类型字段高 4 位为子块数量
+_MAX_SUBCHUNKS = 15
+# extract_incremental 等对未知路径的命名方式
+_UNKNOWN_NAME = re.compile(r'[0-9a-f]{16}\.bin')
+
+
+class WADWriter:
+    """
+    生成 v3 WAD 文件
+
+    条目在线程池中读取并以 zstd 压缩(压缩时释放 GIL), 按顺序直接写入数据区, 同一时间只保留少量条目在内存中;
+    数据区写完后再回填文件头与 TOC.
+    内容相同的条目只压缩、写入一次, 共享同一数据并设置 duplicate 标记.
+    校验和为存储数据(压缩后)的 xxh3_64.
+
+    重新打包:
+        writer = WADWriter()
+        for section in wad.files:
+            writer.add(section.path_hash, lambda s=section: wad.extract_by_section(s, None, raw=True))
+        writer.write('Aatrox.wad.client')
+    """
+    version = (3, 4)
+
+    def __init__(self, level: int = 3, subchunk_size: Optional[int] = None, workers: Optional[int] = None,
+                 dedupe: bool = True, subchunk_toc: Optional[str] = None):
+        """
+        :param level: zstd 压缩等级
+        :param subchunk_size: 子块大小, 大于该值的条目以子块(类型 4)写入, 为空时不使用子块
+        :param workers: 压缩线程数量, 为 None 时由 concurrent.futures 决定
+        :param dedupe: 是否合并内容相同的条目
+        :param subchunk_toc: subchunktoc 在 WAD 中的路径, 为空时根据输出路径推断, 见 WAD.load_subchunk_toc;
+            无法推断时不写入 subchunktoc, 读取时按 zstd 帧头切分子块
+        """
+        if subchunk_size is not None and subchunk_size <= 0:
+            raise ValueError(f'无效的子块大小: {subchunk_size}')
+        self.level = level
+        self.subchunk_size = subchunk_size
+        self.workers = workers
+        self.dedupe = dedupe
+        self.subchunk_toc = subchunk_toc
+        self._entries: Dict[int, Source] = {}
+
+    def add(self, path_or_hash: Union[str, int], data: Source):
+        """
+        添加条目, 路径相同时覆盖之前的条目
+        :param path_or_hash: 条目在 WAD 中的路径或路径哈希
+        :param data: 内容(bytes)、文件路径或返回内容的函数, 后两者在写入时才读取
+        :return:
+        """
+        self._entries[WAD._to_hash(path_or_hash)] = data
+
+    def add_dir(self, root: StrPath, prefix: str = '') -> int:
+        """
+        添加目录下的全部文件, 以相对路径作为条目路径
+        根目录下形如 {hash:016x}.bin 的文件视为未知路径的条目, 直接使用其哈希
+        :param root: 目录
+        :param prefix: 条目路径前缀
+        :return: 添加的文件数量
+        """
+        root = Path(root)
+        count = 0
+        for file in sorted(root.rglob('*')):
+            if not file.is_file():
+                continue
+            rel_path = file.relative_to(root).as_posix()
+            if not prefix and _UNKNOWN_NAME.fullmatch(rel_path):
+                self.add(int(rel_path[:16], 16), file)
+            else:
+                self.add(f'{prefix}{rel_path}', file)
+            count += 1
+        return count
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _load(source: Source) -> bytes:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return bytes(source)
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                return f.read()
+        return source()
+
+    def _compress(self, source: Source, claimed: set, lock: threading.Lock, raw_subchunks: bool) -> Tuple:
+        """
+        读取并压缩单个条目
+        :param source:
+        :param claimed: 已由其他任务处理的内容摘要
+        :param lock:
+        :param raw_subchunks: 是否允许未压缩的子块, 只有写入 subchunktoc 时才能读取
+        :return: (摘要, 解压大小, 类型, [(存储数据, 解压大小), ...]), 重复内容的类型与数据为 None
+        """
+        data = self._load(source)
+        size = len(data)
+        if size >= 1 << 32:
+            raise ValueError(f'条目过大: {size}')
+
+        digest = None
+        if self.dedupe:
+            digest = xxhash.xxh3_128_digest(data)
+            with lock:
+                if digest in claimed:
+                    return digest, size, None, None
+                claimed.add(digest)
+
+        if self.subchunk_size and size > self.subchunk_size:
+            count = min(-(-size // self.subchunk_size), _MAX_SUBCHUNKS)
+            step = -(-size // count)
+            parts = []
+            for start in range(0, size, step):
+                part = data[start:start + step]
+                compressed = zstd.compress(part, self.level)
+                parts.append((part if raw_subchunks and len(compressed) >= len(part) else compressed, len(part)))
+            return digest, size, 4, parts
+
+        compressed = zstd.compress(data, self.level)
+        if len(compressed) >= size:
+            return digest, size, 0, [(data, size)]
+        return digest, size, 3, [(compressed, size)]
+
+    def write(self, output: StrPath) -> List[WADSection]:
+        """
+        写入 WAD 文件
+        :param output: 输出路径
+        :return: 写入的条目, 按路径哈希排序
+        """
+        output = Path(output)
+        toc_name = self.subchunk_toc
+        if self.subchunk_size and toc_name is None:
+            toc_name = _subchunk_toc_name(output)
+        toc_hash = WAD._to_hash(toc_name) if self.subchunk_size and toc_name is not None else None
+        if toc_hash is not None:
+            self._entries.pop(toc_hash, None)
+
+        items = sorted(self._entries.items())
+        count = len(items) + (toc_hash is not None)
+        offset = _HEADER_MAX_SIZE + _TOC.size * count
+
+        records: Dict[int, List] = {}
+        owners: Dict[bytes, int] = {}
+        duplicates: List[Tuple[int, bytes]] = []
+        subchunks: List[Tuple[int, int, int]] = []
+        claimed, lock = set(), threading.Lock()
+
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'wb') as f, ThreadPoolExecutor(max_workers=self.workers) as executor:
+            f.seek(offset)
+            pending = deque()
+            limit = 2 * (self.workers or os.cpu_count() or 1)
+            it = iter(items)
+
+            def submit():
+                for path_hash, source in it:
+                    pending.append((path_hash, executor.submit(
+                        self._compress, source, claimed, lock, toc_hash is not None)))
+                    if len(pending) >= limit:
+                        break
+
+            submit()
+            while pending:
+                path_hash, future = pending.popleft()
+                digest, size, _type, parts = future.result()
+                submit()
+                if parts is None:
+                    duplicates.append((path_hash, digest))
+                    continue
+
+                checksum = xxhash.xxh3_64()
+                first = len(subchunks) if _type == 4 else 0
+                compressed_size = 0
+                for data, part_size in parts:
+                    f.write(data)
+                    checksum.update(data)
+                    compressed_size += len(data)
+                    if _type == 4:
+                        subchunks.append((len(data), part_size, xxhash.xxh3_64_intdigest(data)))
+                if _type == 4:
+                    _type |= len(parts) << 4
+                    if len(subchunks) > 0xFFFF:
+                        raise ValueError(f'子块数量超出上限: {len(subchunks)}')
+
+                records[path_hash] = [path_hash, offset, compressed_size, size, _type, False, first,
+                                      checksum.intdigest()]
+                if digest is not None:
+                    owners[digest] = path_hash
+                offset += compressed_size
+
+            for path_hash, digest in duplicates:
+                owner = records[owners[digest]]
+                owner[5] = True
+                records[path_hash] = [path_hash, *owner[1:]]
+
+            if toc_hash is not None:
+                data = b''.join(_SUBCHUNK.pack(*subchunk) for subchunk in subchunks)
+                f.write(data)
+                records[toc_hash] = [toc_hash, offset, len(data), len(data), 0, False, 0,
+                                     xxhash.xxh3_64_intdigest(data)]
+                offset += len(data)
+
+            if offset >= 1 << 32:
+                raise ValueError(f'WAD 文件过大: {offset}')
+
+            f.seek(0)
+            f.write(_HEADER.pack(b'RW', *self.version, bytes(256), 0, count))
+            for path_hash in sorted(records):
+                f.write(_TOC.pack(*records[path_hash]))
+
+        logger.debug(f'WAD 写入完成: {output}, 条目: {count}, 重复: {len(duplicates)}, 子块: {len(subchunks)}')
+        return [WADSection(*records[path_hash]) for path_hash in sorted(records)]
@@ -4,7 +4,7 @@
 # @Site    : x-item.com
 # @Software: PyCharm
 # @Create  : 2021/3/2 0:57
-# @Update  : 2024/5/4 16:50
+# @Update  : 2026/10/18 9:08
 # @Detail  : 
 
 from league_tools.base import SectionNoId, WemFile
@@ -24,7 +24,7 @@ class WPK(SectionNoId):
         self.files = []
         self.version = self._data.customize('<L')
         self.file_count = self._data.customize('<L')
-        self.offsets = self._data.customize(f'<{self.file_count}L', False)
+        self.offsets = self._data.read_records([('offset', 'L')], self.file_count)['offset'].tolist()
 
         for i in range(self.file_count):
             self._data.seek(self.offsets[i], 0)
@@ -32,7 +32,7 @@ class WPK(SectionNoId):
 
             # 字符串中间有空字节
             # filename = self._data.str(filename_size * 2)
-            filename = bytearray(self._data.customize(f'<{filename_size}H', False)).decode('utf-8')
+            filename = self._data.bytes(filename_size * 2).decode('utf-16-le')
 
             self.files.append(
                 WemFile(
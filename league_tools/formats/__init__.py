@@ -4,22 +4,34 @@
 # @Site    : x-item.com
 # @Software: PyCharm
 # @Create  : 2021/3/4 18:46
-# @Update  : 2024/9/2 8:25
+# @Update  : 2026/10/18 9:34
 # @Detail  : 
 
-from .BIN import BIN, StringHash
+from .BIN import BIN, BinEntry, BinParser, BinStruct, BinType, StringHash, str_fnv_32, str_fnv_32_batch
 from .BNK import BNK, HIRC
-from .WAD import WAD, WadHeaderAnalyzer
+from .WAD import WAD, WADEntryIO, WadHeaderAnalyzer, WadToc
+from .WADIndex import WadIndex
+from .WADWriter import WADWriter
 from .WPK import WPK
 
 __all__ = [
     'BIN',
+    'BinEntry',
+    'BinParser',
+    'BinStruct',
+    'BinType',
     'BNK',
     'WAD',
+    'WADEntryIO',
     'WadHeaderAnalyzer',
+    'WadToc',
+    'WadIndex',
+    'WADWriter',
     'WPK',
     'BNK',
     'HIRC',
     'StringHash',
+    'str_fnv_32',
+    'str_fnv_32_batch',
 ]
 
@@ -4,11 +4,12 @@
 # @Site    : x-item.com
 # @Software: PyCharm
 # @Create  : 2021/3/1 21:09
-# @Update  : 2024/5/4 16:50
+# @Update  : 2026/10/18 9:08
 # @Detail  : Wwise bnk文件, DIDX块
 
+from league_tools.base import RecordList, SectionNoIdBNK, WemFile
 
-from league_tools.base import SectionNoIdBNK, WemFile
+_RECORD = [('id', 'L'), ('offset', 'L'), ('length', 'L')]
 
 
 class DIDX(SectionNoIdBNK):
@@ -30,11 +31,7 @@ class DIDX(SectionNoIdBNK):
     ]
 
     def _read(self):
-        self.files = []
-        for _ in range(self._data.end // 12):
-            self.files.append(
-                WemFile(*self._data.customize('<LLL', False))
-            )
+        self.files = RecordList(self._data.read_records(_RECORD, self._data.end // 12), WemFile)
 
     def __repr__(self):
         return f'Number_Of_Wem_Files: {len(self.files)}'
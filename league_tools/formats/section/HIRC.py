@@ -7,6 +7,7 @@
 # @Update  : 2024/5/4 16:50
 # @Detail  : Wwise bnk文件, HIRC块
 
+import struct
 from typing import Dict
 
 from loguru import logger
@@ -387,6 +388,9 @@ class Attenuation(SectionBNK):
     pass
 
 
+_OBJECT_HEAD = struct.Struct('<BL')
+
+
 class HIRC(SectionNoIdBNK):
     """
     uint32: number of objects
@@ -433,7 +437,7 @@ class HIRC(SectionNoIdBNK):
         number = self._data.customize('<L')
 
         for _ in range(number):
-            section_type, section_length = self._data.customize('<BL', False)
+            section_type, section_length = self._data.read_struct(_OBJECT_HEAD)
             _call, _set = self._parse.get(section_type, (None, None))
             if _call:
                 data = self._data.binary(section_length)
@@ -444,7 +448,8 @@ class HIRC(SectionNoIdBNK):
                 self.number_of_objects += 1
             else:
                 self._data.skip(section_length)
-            logger.trace(f'Type: {section_type}, Length: {section_length}')
+            if self._data.tracing:
+                logger.trace(f'Type: {section_type}, Length: {section_length}')
 
     def _set_actor_mixer(self, data):
         self.actor_mixer.update(data)
@@ -4,13 +4,14 @@
 # @Site    : x-item.com
 # @Software: PyCharm
 # @Create  : 2021/2/27 18:28
-# @Update  : 2024/5/5 23:26
+# @Update  : 2026/10/18 9:15
 # @Detail  : 
 
 # References : http://wiki.xentax.com/index.php/Wwise_SoundBank_(*.bnk)#HIRC_section
 
 from collections import OrderedDict, defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import IOBase
 from pathlib import Path
 from typing import List, Optional, Union
 
@@ -162,7 +163,7 @@ def get_audio_files(audio_file: StrPath, get_data=True, hash_table: Optional[Lis
         -> List[WemFile]:
     """
     提供音频文件, 返回文件列表
-    :param audio_file: 音频文件(bnk、wpk)
+    :param audio_file: 音频文件(bnk、wpk), 可以是路径、字节数据或文件对象(如 WAD.open 的返回值)
     :param get_data: 是否获取音频文件数据
     :param hash_table: 哈希表
     :return:
@@ -174,6 +175,10 @@ def get_audio_files(audio_file: StrPath, get_data=True, hash_table: Optional[Lis
         br = BinaryReader(audio_file)
         head = br.customize('<4s')
         audio_ext = '.wpk' if head == b'r3d2' else '.bnk'
+    elif isinstance(audio_file, IOBase):
+        head = audio_file.read(4)
+        audio_file.seek(0)
+        audio_ext = '.wpk' if head == b'r3d2' else '.bnk'
     else:
         return []
 
@@ -208,11 +213,11 @@ def get_audio_files(audio_file: StrPath, get_data=True, hash_table: Optional[Lis
 def get_event_hashtable(bin_file: Union[StrPath, List[StringHash]], event_file):
     """
     根据皮肤bin文件以及音频事件, 提取事件哈希表
-    :param bin_file: bin文件
+    :param bin_file: bin文件(路径、字节数据或文件对象)或事件哈希表
     :param event_file: bnk event文件
     :return:
     """
-    if isinstance(bin_file, str) or hasattr(bin_file, "__fspath__"):
+    if isinstance(bin_file, (str, bytes, IOBase)) or hasattr(bin_file, "__fspath__"):
         b1 = BIN(bin_file)
         # 获取事件哈希表
         read_strings = b1.hash_tables.copy()
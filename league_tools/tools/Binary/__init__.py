@@ -4,9 +4,14 @@
 # @Site    : x-item.com
 # @Software: Pycharm
 # @Create  : 2024/3/24 1:12
-# @Update  : 2024/3/24 1:12
+# @Update  : 2026/10/18 9:08
 # @Detail  : 
 
-from .reader import BinaryReader
+from .reader import BinaryReader, MemoryBuffer, RecordArray, get_record
 
-__all__ = BinaryReader
+__all__ = [
+    'BinaryReader',
+    'MemoryBuffer',
+    'RecordArray',
+    'get_record'
+]
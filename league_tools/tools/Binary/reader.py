@@ -4,50 +4,371 @@
 # @Site    : x-item.com
 # @Software: Pycharm
 # @Create  : 2021/3/4 20:43
-# @Update  : 2022/10/10 20:47
+# @Update  : 2026/10/18 9:41
 # @Detail  : 
 
 import io
+import mmap
 import os
+import re
 import struct
+import sys
+import threading
+from array import array
 from io import BytesIO, IOBase
-from typing import Union
+from typing import Dict, Iterator, Optional, Pattern, Sequence, Tuple, Union
 
 from loguru import logger
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# 解包表达式缓存, 避免每次调用都重新解析格式字符串
+_STRUCT_CACHE: Dict[str, struct.Struct] = {}
+_STRUCT_CACHE_SIZE = 1024
+
+
+def get_struct(fmt: str) -> struct.Struct:
+    """
+    获取预编译的 struct.Struct, 同一表达式只编译一次
+    :param fmt: 表达式
+    :return:
+    """
+    s = _STRUCT_CACHE.get(fmt)
+    if s is None:
+        if len(_STRUCT_CACHE) >= _STRUCT_CACHE_SIZE:
+            # 变长表达式(如 f'<{count}L')过多时直接清空, 常用表达式会很快重新缓存
+            _STRUCT_CACHE.clear()
+        s = _STRUCT_CACHE[fmt] = struct.Struct(fmt)
+    return s
+
+
+# 定长记录字段描述, 如 [('id', 'L'), ('offset', 'L'), ('length', 'L')], 统一为小端序
+RecordDtype = Sequence[Tuple[str, str]]
+
+# struct 类型码 -> (numpy 类型, array 类型码)
+_RECORD_TYPES = {
+    'b': ('i1', 'b'), 'B': ('u1', 'B'), '?': ('?', 'B'),
+    'h': ('<i2', 'h'), 'H': ('<u2', 'H'),
+    'i': ('<i4', 'i'), 'I': ('<u4', 'I'), 'l': ('<i4', 'i'), 'L': ('<u4', 'I'),
+    'q': ('<i8', 'q'), 'Q': ('<u8', 'Q'),
+    'f': ('<f4', 'f'), 'd': ('<f8', 'd'),
+}
+
+_RECORD_CACHE: Dict[Tuple[Tuple[str, str], ...], Tuple[struct.Struct, object]] = {}
+
+
+def _compile_record(dtype: RecordDtype) -> Tuple[struct.Struct, object]:
+    """
+    编译记录描述, 返回 struct.Struct 以及 numpy dtype(未安装 numpy 时为 None)
+    :param dtype:
+    :return:
+    """
+    key = tuple(dtype)
+    if (compiled := _RECORD_CACHE.get(key)) is None:
+        s = struct.Struct('<' + ''.join(code for _, code in key))
+        np_dtype = None
+        if numpy is not None:
+            np_dtype = numpy.dtype([(name, _RECORD_TYPES[code][0]) for name, code in key])
+        compiled = _RECORD_CACHE[key] = (s, np_dtype)
+    return compiled
+
+
+def get_record(records, index: int) -> Tuple:
+    """
+    从 read_records 的返回值中取出单条记录, 统一转换为 Python 元组
+    :param records: numpy 结构化数组或 RecordArray
+    :param index: 索引
+    :return:
+    """
+    row = records[index]
+    if isinstance(row, tuple):
+        return row
+    return row.item()
+
+
+class RecordArray:
+    """
+    未安装 numpy 时 read_records 的返回值, 接口与 numpy 结构化数组的常用部分保持一致:
+    records[i] 返回单条记录(元组), records['name'] 返回整列, len(records) 返回记录数量
+
+    记录数据为底层缓冲区的零拷贝视图, 单条记录在访问时才解包;
+    所有字段类型相同且与本机字节序一致时, 整列直接使用 memoryview.cast 的跨步视图
+    """
+    __slots__ = ('dtype', 'names', '_struct', '_view', '_count', '_columns')
+
+    def __init__(self, dtype: RecordDtype, view: memoryview, count: int):
+        self.dtype = tuple(dtype)
+        self.names = tuple(name for name, _ in self.dtype)
+        self._struct = _compile_record(self.dtype)[0]
+        self._view = view
+        self._count = count
+        self._columns = None
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return self._struct.iter_unpack(self._view)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)
+        if key < 0:
+            key += self._count
+        if not 0 <= key < self._count:
+            raise IndexError('记录索引超出范围')
+        return self._struct.unpack_from(self._view, key * self._struct.size)
+
+    def column(self, name: str):
+        """
+        获取整列数据
+        :param name: 字段名
+        :return: memoryview 或 array.array
+        """
+        index = self.names.index(name)
+        codes = {_RECORD_TYPES[code][1] for _, code in self.dtype}
+        if len(codes) == 1 and sys.byteorder == 'little':
+            code = codes.pop()
+            if array(code).itemsize * len(self.dtype) == self._struct.size:
+                return self._view.cast(code)[index::len(self.dtype)]
+
+        if self._columns is None:
+            self._columns = [array(_RECORD_TYPES[code][1]) for _, code in self.dtype]
+            for row in self:
+                for col, value in zip(self._columns, row):
+                    col.append(value)
+        return self._columns[index]
+
+    def tolist(self):
+        return list(self)
+
+
+class MemoryBuffer:
+    """
+    基于 memoryview 的只读游标, 接口与文件对象保持一致(read/seek/tell/close)
+
+    多个 MemoryBuffer 可以共享同一块内存(mmap 或 bytes), 各自维护独立的指针,
+    通过 sub 截取子区间时不会复制任何数据.
+    """
+    __slots__ = ('view', 'pos', 'end', '_mmap')
+
+    def __init__(self, view: memoryview, _mmap: Optional[mmap.mmap] = None):
+        self.view = view
+        self.pos = 0
+        self.end = len(view)
+        self._mmap = _mmap
+
+    @classmethod
+    def from_file(cls, file: Union[str, os.PathLike]) -> 'MemoryBuffer':
+        """
+        以只读方式映射整个文件, 空文件无法映射, 直接使用空视图
+        :param file: 文件路径
+        :return:
+        """
+        with io.open(file, 'rb') as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                return cls(memoryview(b''))
+        return cls(memoryview(mm), mm)
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        start = self.pos
+        if start >= self.end:
+            return b''
+        if size is None or size < 0:
+            stop = self.end
+        else:
+            stop = min(start + size, self.end)
+        self.pos = stop
+        return self.view[start:stop].tobytes()
+
+    def sub(self, size: Optional[int] = None) -> 'MemoryBuffer':
+        """
+        从当前指针截取一段零拷贝子视图, 并移动当前指针
+        :param size: 长度, 为空则截取至结尾
+        :return:
+        """
+        start = min(self.pos, self.end)
+        stop = self.end if size is None or size < 0 else min(start + size, self.end)
+        self.pos = max(self.pos, stop)
+        return MemoryBuffer(self.view[start:stop])
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if whence == 0:
+            pos = offset
+        elif whence == 1:
+            pos = self.pos + offset
+        elif whence == 2:
+            pos = self.end + offset
+        else:
+            raise ValueError(f'无效的 whence: {whence}')
+        if pos < 0:
+            raise ValueError(f'无效的偏移: {pos}')
+        self.pos = pos
+        return pos
+
+    def tell(self) -> int:
+        return self.pos
+
+    def close(self):
+        """
+        释放视图, 仍有子视图引用 mmap 时由子视图在回收时负责释放
+        :return:
+        """
+        view, self.view = self.view, memoryview(b'')
+        view.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass
+            self._mmap = None
+
 
 class BinaryReader:
     """
     以二进制操作流、文件
+
+    路径默认使用 mmap 映射, bytes/bytearray/memoryview 直接使用 memoryview,
+    这两种情况下 binary() 返回共享同一块内存的子读取器, 不再复制数据;
+    其余文件对象保持原有的流式读取.
     """
 
-    def __init__(self, file: Union[IOBase, BytesIO, bytes, str, os.PathLike]):
+    def __init__(self, file: Union[IOBase, BytesIO, MemoryBuffer, bytes, bytearray, memoryview, str, os.PathLike],
+                 use_mmap: bool = True):
+        """
+        :param file: 文件路径、字节数据或文件对象
+        :param use_mmap: 传入路径时是否使用 mmap 映射, 否则以普通文件对象读取
+        """
         if isinstance(file, str) or isinstance(file, os.PathLike):
-            self.buffer = io.open(file, 'rb')
-        elif isinstance(file, bytes):
-            self.buffer = BytesIO(file)
+            self.buffer = MemoryBuffer.from_file(file) if use_mmap else io.open(file, 'rb')
+        elif isinstance(file, (bytes, bytearray, memoryview)):
+            self.buffer = MemoryBuffer(memoryview(file).cast('B'))
         else:
             self.buffer = file
 
         self.end = self.buffer.seek(0, 2)
         self.buffer.seek(0)
+        # 流模式且无法使用 os.pread 时, 保护 pread 的 seek + read
+        self._lock = threading.Lock()
+
+    @property
+    def zero_copy(self) -> bool:
+        """
+        是否为内存视图模式
+        :return:
+        """
+        return isinstance(self.buffer, MemoryBuffer)
+
+    # 流模式下查询时每次读取的块大小
+    chunk_size = 1 << 20
+
+    # 是否输出解包跟踪日志, 通过 set_trace 开启
+    tracing = False
 
-    def _unpack(self, fmt, one=True):
+    @classmethod
+    def set_trace(cls, enabled: bool = True):
+        """
+        开启或关闭解包跟踪日志
+        关闭时直接使用无日志的实现, 不产生任何额外开销
+        :param enabled:
+        :return:
+        """
+        cls.tracing = enabled
+        cls._unpack = cls._unpack_trace if enabled else cls._unpack_fast
+
+    def _unpack_fast(self, fmt, one=True):
         """
         解包
         :param fmt: 表达式
         :param one: 是否仅取第一位
         :return:
         """
-        length = struct.calcsize(fmt)
-        before = self.buffer.tell()
-        d1 = self.buffer.read(length)
-        if length > len(d1):
+        data = self.read_struct(get_struct(fmt))
+        if not data:
             return None if one else []
-        data = struct.unpack(fmt, d1)
-        logger.trace(f'{fmt}: {length}, before: {before}, after: {self.buffer.tell()}')
         return data[0] if one else data
 
+    def _unpack_trace(self, fmt, one=True):
+        before = self.buffer.tell()
+        data = self._unpack_fast(fmt, one)
+        logger.trace(f'{fmt}: {get_struct(fmt).size}, before: {before}, after: {self.buffer.tell()}')
+        return data
+
+    _unpack = _unpack_fast
+
+    def read_struct(self, s: struct.Struct) -> Tuple:
+        """
+        使用预编译的 struct.Struct 解包, 内存视图模式下直接在底层缓冲区上 unpack_from
+        :param s: struct.Struct
+        :return: 解包结果, 数据不足时返回空元组
+        """
+        buffer = self.buffer
+        if isinstance(buffer, MemoryBuffer):
+            pos = buffer.pos
+            if pos + s.size > buffer.end:
+                return ()
+            buffer.pos = pos + s.size
+            return s.unpack_from(buffer.view, pos)
+
+        d1 = buffer.read(s.size)
+        if s.size > len(d1):
+            return ()
+        return s.unpack(d1)
+
+    def pread(self, offset: int, length: int) -> bytes:
+        """
+        按绝对位置读取, 不使用也不改变当前指针, 可在多个线程间共享
+        内存视图模式直接切片; 文件对象优先使用 os.pread, 否则加锁读取
+        :param offset: 绝对偏移
+        :param length: 长度
+        :return:
+        """
+        buffer = self.buffer
+        if isinstance(buffer, MemoryBuffer):
+            return buffer.view[offset:offset + length].tobytes()
+
+        if hasattr(os, 'pread'):
+            try:
+                fd = buffer.fileno()
+            except (AttributeError, OSError):
+                fd = None
+            if fd is not None:
+                return os.pread(fd, length, offset)
+
+        with self._lock:
+            current = buffer.tell()
+            buffer.seek(offset, 0)
+            data = buffer.read(length)
+            buffer.seek(current, 0)
+        return data
+
+    def advise(self, offset: int, length: int):
+        """
+        提示系统即将读取该区间(预读), 不支持时忽略
+        mmap 使用 madvise(MADV_WILLNEED), 文件对象使用 posix_fadvise(POSIX_FADV_WILLNEED)
+        :param offset: 绝对偏移
+        :param length: 长度
+        :return:
+        """
+        buffer = self.buffer
+        length = min(length, self.end - offset)
+        if length <= 0:
+            return
+        try:
+            if isinstance(buffer, MemoryBuffer):
+                if buffer._mmap is not None and hasattr(mmap, 'MADV_WILLNEED'):
+                    start = offset - offset % mmap.PAGESIZE
+                    buffer._mmap.madvise(mmap.MADV_WILLNEED, start, offset + length - start)
+            elif hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(buffer.fileno(), offset, length, os.POSIX_FADV_WILLNEED)
+        except (AttributeError, OSError, ValueError):
+            pass
+
     def bytes(self, length=None) -> bytes:
         """
         读字节 file.read
@@ -64,9 +385,7 @@ class BinaryReader:
         :return:
         """
 
-        data = self._unpack(f'{length}s')
-
-        return data.decode(encoding)
+        return self.buffer.read(length).decode(encoding)
 
     def customize(self, f, one=True):
         """
@@ -80,10 +399,34 @@ class BinaryReader:
     def binary(self, length=None):
         """
         读取后重新打包为BinaryReader
+        内存视图模式下返回共享内存、拥有独立指针的子读取器, 不复制数据
         :param length:
         :return:
         """
-        return BinaryReader(BytesIO(self.buffer.read(length)))
+        if isinstance(self.buffer, MemoryBuffer):
+            return BinaryReader(self.buffer.sub(length))
+        return BinaryReader(self.buffer.read(length))
+
+    def read_records(self, dtype: RecordDtype, count: int):
+        """
+        一次性读取定长记录表
+        安装 numpy 时返回结构化数组, 否则返回 RecordArray; 内存视图模式下均不复制数据
+        :param dtype: 字段描述, 如 [('id', 'L'), ('offset', 'L'), ('length', 'L')]
+        :param count: 记录数量
+        :return:
+        """
+        s, np_dtype = _compile_record(dtype)
+        length = s.size * count
+        if isinstance(self.buffer, MemoryBuffer):
+            view = self.buffer.sub(length).view
+        else:
+            view = memoryview(self.buffer.read(length))
+        if len(view) < length:
+            raise ValueError(f'记录表数据不足: {len(view)} < {length}')
+
+        if np_dtype is not None:
+            return numpy.frombuffer(view, dtype=np_dtype, count=count)
+        return RecordArray(dtype, view, count)
 
     def skip(self, lenght):
         """
@@ -104,65 +447,139 @@ class BinaryReader:
 
         self.buffer.seek(offset, whence)
 
+    @staticmethod
+    def _to_bytes(sub: Union[bytes, bytearray, list, str]) -> bytes:
+        if isinstance(sub, list):
+            return bytes(bytearray(sub))
+        elif isinstance(sub, str):
+            return sub.encode('utf-8')
+        return bytes(sub)
+
+    @staticmethod
+    def compile_pattern(sub: Union[bytes, bytearray, list, str], wildcard=False) -> Pattern:
+        """
+        将查询内容编译为字节正则
+        :param sub: 字节、字节数组、10进制数组或字符串
+        :param wildcard: 是否将 0x3F(?) 视为匹配任意单字节的通配符
+        :return:
+        """
+        sub = BinaryReader._to_bytes(sub)
+        if wildcard:
+            pattern = b''.join(b'.' if c == 0x3F else re.escape(bytes((c,))) for c in sub)
+        else:
+            pattern = re.escape(sub)
+        return re.compile(pattern, re.DOTALL)
+
+    def _iter_matches(self, pattern: Pattern, length: int, start: int, first=False) -> Iterator[int]:
+        """
+        从 start 开始查找所有不重叠的匹配, 返回绝对偏移
+        内存视图模式直接在底层缓冲区上匹配; 流模式分块读取, 块之间保留 length - 1 字节重叠
+        :param pattern: 编译后的正则
+        :param length: 匹配长度(固定)
+        :param start: 起始偏移
+        :param first: 仅查找第一个
+        :return:
+        """
+        buffer = self.buffer
+        if isinstance(buffer, MemoryBuffer):
+            if first:
+                m = pattern.search(buffer.view, start)
+                if m:
+                    yield m.start()
+                return
+            for m in pattern.finditer(buffer.view, start):
+                yield m.start()
+            return
+
+        keep = max(length - 1, 0)
+        base = start
+        tail = b''
+        while True:
+            buffer.seek(base + len(tail), 0)
+            chunk = buffer.read(self.chunk_size)
+            if not chunk:
+                return
+            data = tail + chunk
+            pos = 0
+            while (m := pattern.search(data, pos)) is not None:
+                yield base + m.start()
+                if first:
+                    return
+                pos = m.end()
+            # 已匹配区域不再参与下一块, 保证结果不重叠
+            cut = max(len(data) - keep, pos)
+            tail = data[cut:]
+            base += cut
+
+    def finditer(self, sub: Union[bytes, bytearray, list, str], start: Optional[int] = None,
+                 wildcard=False) -> Iterator[int]:
+        """
+        一次遍历返回所有匹配的起始偏移(绝对位置), 不改变当前指针
+        :param sub: 字节、字节数组、10进制数组或字符串
+        :param start: 起始偏移, 默认为当前指针
+        :param wildcard: 是否将 0x3F(?) 视为通配符
+        :return:
+        """
+        sub = self._to_bytes(sub)
+        current = self.buffer.tell()
+        if start is None:
+            start = current
+        try:
+            yield from self._iter_matches(self.compile_pattern(sub, wildcard), len(sub), start)
+        finally:
+            self.buffer.seek(current, 0)
+
+    def _search(self, sub: bytes, start: int, wildcard=False) -> int:
+        current = self.buffer.tell()
+        point = next(self._iter_matches(self.compile_pattern(sub, wildcard), len(sub), start, True), -1)
+        self.buffer.seek(current, 0)
+        return point
+
     def find(self, sub: Union[bytes, bytearray, list, str], start=False):
         """
         查询, 支持字节、字节数组、10进制数组
         :param sub:
         :param start:
-        :return: 返回当前指针位置
+        :return: 返回相对于查询起点的位置, 找到后指针移动到匹配结尾, 未找到时指针移动到流结尾
         """
-        if isinstance(sub, list):
-            sub = bytes(bytearray(sub))
-        elif isinstance(sub, bytearray):
-            sub = bytes(sub)
-        elif isinstance(sub, str):
-            sub = bytes(sub.encode('utf-8'))
+        sub = self._to_bytes(sub)
 
         if start:
             self.buffer.seek(0, 0)
 
         current = self.buffer.tell()
 
-        point = self.bytes().find(sub)
+        point = self._search(sub, current)
 
         if point != -1:
-            self.seek(point + len(sub) + current, 0)
-        logger.trace(f'current point3: {self.buffer.tell()}')
+            self.seek(point + len(sub), 0)
+            point -= current
+        else:
+            self.buffer.seek(self.end, 0)
+        if self.tracing:
+            logger.trace(f'current point3: {self.buffer.tell()}')
         return point
 
-    def find_by_signature(self, sub: Union[bytearray, list, str], start=False):
-        class TempException(Exception):
-            def __init__(self, point):
-                self.point = point
-
-        if isinstance(sub, str):
-            sub = bytes(sub.encode('utf-8'))
-        elif isinstance(sub, list):
-            sub = bytes(sub)
+    def find_by_signature(self, sub: Union[bytes, bytearray, list, str], start=False):
+        """
+        按特征码查询, 0x3F(?) 匹配任意单字节
+        :param sub:
+        :param start:
+        :return: 找到后指针移动到匹配结尾并返回该位置, 否则指针移动到流结尾并返回 None
+        """
+        sub = self._to_bytes(sub)
 
         if start:
             self.buffer.seek(0, 0)
 
-        temp = self.bytes()
+        point = self._search(sub, self.buffer.tell(), wildcard=True)
+        if point == -1:
+            self.buffer.seek(self.end, 0)
+            return None
 
-        length = len(sub)
-
-        try:
-            for i in range(len(temp) - length):
-                data = temp[i:length + i]
-                if len(data) != length:
-                    continue
-
-                for j in range(length):
-                    if sub[j] == 0x3F:
-                        continue
-                    if data[j] != sub[j]:
-                        break
-                    if j == length - 1 and data[j] == sub[j]:
-                        raise TempException(i + length + 1)
-        except TempException as e:
-            self.buffer.seek(e.point, 0)
-            return e.point
+        point += len(sub)
+        self.buffer.seek(point, 0)
+        return point
 
     def is_end(self):
         """
@@ -6,8 +6,15 @@
 # @Software: PyCharm
 # @Detail  :
 
-from .Binary.reader import BinaryReader
+from .Binary.reader import BinaryReader, MemoryBuffer, RecordArray, get_record
+from .cache import ByteLRUCache
+from .hashtable import HashTable
 
 __all__ = [
-    'BinaryReader'
+    'BinaryReader',
+    'ByteLRUCache',
+    'HashTable',
+    'MemoryBuffer',
+    'RecordArray',
+    'get_record'
 ]
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# @Author  : Virace
+# @Email   : Virace@aliyun.com
+# @Site    : x-item.com
+# @Software: Pycharm
+# @Create  : 2026/10/18 12:40
+# @Update  : 2026/10/18 12:40
+# @Detail  : 按字节数限制容量的 LRU 缓存
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+
+class ByteLRUCache:
+    """
+    按字节数限制容量的 LRU 缓存, 线程安全
+
+    容量以所有值的总长度计算, 而不是条目数量; 超出容量时淘汰最久未使用的条目.
+    可以在多个对象之间共享, 例如同一文件的多个 WAD 实例.
+    """
+
+    def __init__(self, capacity: int = 256 * 1024 * 1024):
+        """
+        :param capacity: 最大字节数
+        """
+        self.capacity = capacity
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items: 'OrderedDict[Hashable, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """
+        获取缓存, 命中时将其标记为最近使用
+        :param key:
+        :return: 不存在时返回 None
+        """
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: bytes) -> bool:
+        """
+        写入缓存, 单个值超过容量时不缓存
+        :param key:
+        :param value:
+        :return: 是否写入
+        """
+        length = len(value)
+        if length > self.capacity:
+            return False
+        with self._lock:
+            if (old := self._items.pop(key, None)) is not None:
+                self.size -= len(old)
+            self._items[key] = value
+            self.size += length
+            while self.size > self.capacity:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        命中统计
+        :return:
+        """
+        with self._lock:
+            return dict(
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                entries=len(self._items),
+                size=self.size,
+                capacity=self.capacity
+            )
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def __repr__(self):
+        return f'Entries: {len(self._items)}, ' \
+               f'Size: {self.size}/{self.capacity}, ' \
+               f'Hits: {self.hits}, ' \
+               f'Misses: {self.misses}'
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+# @Author  : Virace
+# @Email   : Virace@aliyun.com
+# @Site    : x-item.com
+# @Software: Pycharm
+# @Create  : 2026/10/18 13:10
+# @Update  : 2026/10/18 13:10
+# @Detail  : 编译后的路径哈希表, 内存映射后二分查找
+
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+from league_tools.tools.Binary.reader import MemoryBuffer
+from league_tools.utils.type_hints import StrPath
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# 文件头: 标识、版本、条目数量、字符串区长度
+_HEADER = struct.Struct('<4sLQQ')
+_MAGIC = b'LTHT'
+_VERSION = 1
+
+
+class HashTable:
+    """
+    编译后的哈希表, 用于代替 {'hash:10': 'path:str'} 形式的字典
+
+    文件结构(小端): 文件头 | 升序排列的 uint64 哈希 | count + 1 个 uint64 字符串偏移 | utf-8 字符串区.
+    打开时只做内存映射, 不解析任何内容, 多个进程打开同一文件时共享系统页缓存;
+    单个查询为二分查找, 安装 numpy 时批量查询使用 searchsorted 向量化完成.
+    对象可以被 pickle, 传入进程池时只传递文件路径, 在子进程中重新映射.
+    """
+
+    def __init__(self, file: StrPath):
+        """
+        :param file: 由 compile 生成的文件
+        """
+        self.file = file
+        self._buffer = MemoryBuffer.from_file(file)
+        view = self._buffer.view
+        if len(view) < _HEADER.size:
+            raise ValueError(f'错误的哈希表文件: {file}')
+        magic, version, self.count, blob_size = _HEADER.unpack_from(view)
+        if magic != _MAGIC:
+            raise ValueError(f'错误的文件头: {magic}')
+        if version != _VERSION:
+            raise ValueError(f'不支持的哈希表版本: {version}')
+
+        start = _HEADER.size
+        offsets_start = start + 8 * self.count
+        blob_start = offsets_start + 8 * (self.count + 1)
+        if len(view) < blob_start + blob_size:
+            raise ValueError(f'哈希表数据不足: {len(view)} < {blob_start + blob_size}')
+
+        if numpy is not None:
+            self._hashes = numpy.frombuffer(view, dtype='<u8', count=self.count, offset=start)
+            self._offsets = numpy.frombuffer(view, dtype='<u8', count=self.count + 1, offset=offsets_start)
+        else:
+            self._hashes = self._cast(view[start:offsets_start])
+            self._offsets = self._cast(view[offsets_start:blob_start])
+        self._blob = view[blob_start:blob_start + blob_size]
+
+    @staticmethod
+    def _cast(view: memoryview):
+        if sys.byteorder == 'little':
+            return view.cast('Q')
+        # 大端平台无法直接转换, 复制一份
+        return [value for value, in struct.iter_unpack('<Q', view)]
+
+    @classmethod
+    def compile(cls, source: Union[StrPath, Mapping[Union[str, int], str], Iterable[Tuple[int, str]]],
+                output: StrPath) -> 'HashTable':
+        """
+        生成哈希表文件, 只需执行一次
+
+        :param source: 以下任意一种
+            - 文本文件路径, 每行 "16 位十六进制哈希 路径", 如 CDTB 的 hashes.game.txt
+            - 字典 {'hash:10': 'path:str'} 或 {hash: path}
+            - (hash, path) 的可迭代对象
+        :param output: 输出文件路径
+        :return: 打开后的 HashTable
+        """
+        if isinstance(source, (str, os.PathLike)):
+            items = cls._parse_text(source)
+        elif isinstance(source, Mapping):
+            items = ((int(key), value) for key, value in source.items())
+        else:
+            items = source
+
+        table = {}
+        for path_hash, path in items:
+            table[path_hash] = path
+        hashes = sorted(table)
+
+        with open(output, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, len(hashes), 0))
+            f.write(cls._pack(hashes))
+            blob = [table[path_hash].encode('utf-8') for path_hash in hashes]
+            del table
+            offset = 0
+            offsets = [0]
+            for item in blob:
+                offset += len(item)
+                offsets.append(offset)
+            f.write(cls._pack(offsets))
+            f.write(b''.join(blob))
+            f.seek(0)
+            f.write(_HEADER.pack(_MAGIC, _VERSION, len(hashes), offset))
+        return cls(output)
+
+    @staticmethod
+    def _pack(values: List[int]) -> bytes:
+        data = array('Q', values)
+        if sys.byteorder != 'little':
+            data.byteswap()
+        return data.tobytes()
+
+    @staticmethod
+    def _parse_text(file: StrPath) -> Iterator[Tuple[int, str]]:
+        with open(file, encoding='utf-8') as f:
+            for line in f:
+                line = line.rstrip('\r\n')
+                if not line:
+                    continue
+                path_hash, _, path = line.partition(' ')
+                yield int(path_hash, 16), path
+
+    def _index(self, path_hash: int) -> int:
+        """
+        :param path_hash:
+        :return: 所在位置, 不存在返回 -1
+        """
+        if numpy is not None:
+            if not 0 <= path_hash < 1 << 64:
+                return -1
+            index = int(numpy.searchsorted(self._hashes, numpy.uint64(path_hash)))
+        else:
+            index = bisect_left(self._hashes, path_hash)
+        if index < self.count and self._hashes[index] == path_hash:
+            return index
+        return -1
+
+    def _name(self, index: int) -> str:
+        return bytes(self._blob[int(self._offsets[index]):int(self._offsets[index + 1])]).decode('utf-8')
+
+    def get(self, path_hash: int, default: Optional[str] = None) -> Optional[str]:
+        """
+        查询路径
+        :param path_hash: 路径哈希
+        :param default: 不存在时的返回值
+        :return:
+        """
+        index = self._index(path_hash)
+        return default if index == -1 else self._name(index)
+
+    def resolve(self, hashes: Iterable[int]) -> List[Optional[str]]:
+        """
+        批量查询, 安装 numpy 时向量化完成
+        :param hashes: 路径哈希, 可以是 numpy 数组
+        :return: 与输入顺序一致的路径列表, 不存在的为 None
+        """
+        if numpy is None:
+            return [self.get(path_hash) for path_hash in hashes]
+
+        keys = numpy.asarray(hashes if isinstance(hashes, numpy.ndarray) else list(hashes), dtype=numpy.uint64)
+        if not self.count:
+            return [None] * len(keys)
+        index = numpy.searchsorted(self._hashes, keys)
+        found = self._hashes[numpy.minimum(index, self.count - 1)] == keys
+        result: List[Optional[str]] = [None] * len(keys)
+        for i in numpy.flatnonzero(found).tolist():
+            result[i] = self._name(int(index[i]))
+        return result
+
+    def items(self) -> Iterator[Tuple[int, str]]:
+        """
+        按哈希升序遍历全部条目
+        :return:
+        """
+        for index in range(self.count):
+            yield int(self._hashes[index]), self._name(index)
+
+    def __getitem__(self, path_hash: int) -> str:
+        index = self._index(path_hash)
+        if index == -1:
+            raise KeyError(path_hash)
+        return self._name(index)
+
+    def __contains__(self, path_hash: int) -> bool:
+        return self._index(path_hash) != -1
+
+    def __len__(self):
+        return self.count
+
+    def __getstate__(self):
+        return {'file': self.file}
+
+    def __setstate__(self, state):
+        self.__init__(state['file'])
+
+    def close(self):
+        """
+        释放映射
+        :return:
+        """
+        self._hashes = self._offsets = self._blob = None
+        self._buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return f'File: {self.file}, ' \
+               f'Count: {self.count}'